@@ -0,0 +1,88 @@
+"""
+Replay a recorded session trace against the real-time pipeline, offline.
+
+    python -m api.benchmarks.replay traces/<session_id>.trace --speed 4
+    python -m api.benchmarks.replay traces/<session_id>.trace --speed 0 --no-upstream-delay
+
+Chunks are fed to `transcribe_and_translate` on their recorded arrival schedule
+(`--speed 1` real time, `--speed 4` four times faster, `--speed 0` as fast as possible).
+Groq and the translators are mocked from the recorded responses; local audio work
+(overlap, durations) runs for real. Results are compared with the recorded ones and
+per-chunk latency is reported.
+"""
+import time
+import asyncio
+import argparse
+import statistics
+from api.core.trace import read_trace, TraceUpstream, START, CHUNK, RESULT
+from api.core.utils import transcribe_and_translate
+from api.core.audio import audio_processor
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+async def replay(path: str, speed: float = 1.0, upstream_delay: bool = True) -> dict:
+    records = list(read_trace(path))
+    meta = next((r.meta for r in records if r.kind == START), {})
+    chunks = [r for r in records if r.kind == CHUNK and not r.meta.get("dropped")]
+    expected = [r.meta for r in records if r.kind == RESULT]
+    upstream = TraceUpstream(records, speed, upstream_delay)
+
+    loop = asyncio.get_running_loop()
+    arrivals = []
+    begin = loop.time()
+
+    async def audio_stream():
+        origin = chunks[0].t if chunks else 0.0
+        for record in chunks:
+            if speed > 0:
+                await asyncio.sleep(max(0.0, begin + (record.t - origin) / speed - loop.time()))
+            arrivals.append(loop.time())
+            yield record.payload
+
+    latencies, mismatches = [], []
+    cpu = time.process_time()
+    seq = 0
+    async for result in transcribe_and_translate(audio_stream(), meta.get("source", "fr"), meta.get("targets", ["en"]),
+                                                 upstream=upstream):
+        latencies.append(loop.time() - arrivals[seq])
+        if seq < len(expected):
+            recorded = expected[seq]
+            if result.transcription != recorded["transcription"] or result.translations != recorded["translations"]:
+                mismatches.append(seq)
+        seq += 1
+
+    await audio_processor.shutdown()
+    return {
+        "session_id": meta.get("session_id"),
+        "chunks": seq,
+        "recorded_results": len(expected),
+        "mismatches": mismatches,
+        "wall_seconds": round(loop.time() - begin, 3),
+        "cpu_seconds": round(time.process_time() - cpu, 3),
+        "recorded_seconds": round(chunks[-1].t - chunks[0].t, 3) if chunks else 0.0,
+        "latency_p50": round(statistics.median(latencies), 4) if latencies else 0.0,
+        "latency_p95": round(_percentile(latencies, 0.95), 4),
+        "latency_max": round(max(latencies, default=0.0), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = original speed, 0 = as fast as possible")
+    parser.add_argument("--no-upstream-delay", action="store_true", help="answer mocked upstream calls immediately")
+    args = parser.parse_args()
+
+    report = asyncio.run(replay(args.trace, args.speed, not args.no_upstream_delay))
+    for key, value in report.items():
+        print(f"{key:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
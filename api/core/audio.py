@@ -0,0 +1,200 @@
+import io
+import asyncio
+import subprocess
+import logging
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional
+from pydub import AudioSegment
+from api.core.config import get_settings
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+AUDIO_WORKERS = get_settings().audio_workers
+AUDIO_MAX_JOBS = get_settings().audio_max_jobs
+BACKGROUND_WORKERS = get_settings().background_workers
+
+
+# --------------------------
+# CODEC HELPERS (run inside the worker processes)
+# --------------------------
+
+def _decode(data: bytes, fmt: Optional[str]) -> AudioSegment:
+    """Decode in-memory audio without going through a temporary file."""
+    return AudioSegment.from_file(io.BytesIO(data), format=fmt)
+
+
+def _encode(segment: AudioSegment, fmt: str, **export_kwargs) -> bytes:
+    buffer = io.BytesIO()
+    segment.export(buffer, format=fmt, **export_kwargs)
+    return buffer.getvalue()
+
+
+def _concatenate(segments: List[AudioSegment]) -> AudioSegment:
+    """
+    Concatenate segments by joining their PCM buffers once,
+    instead of the quadratic `merged + segment` loop.
+    """
+    if not segments:
+        return AudioSegment.empty()
+
+    first = segments[0]
+    aligned = [
+        s.set_frame_rate(first.frame_rate).set_channels(first.channels).set_sample_width(first.sample_width)
+        for s in segments
+    ]
+    return first._spawn(b"".join(s.raw_data for s in aligned))
+
+
+def merge_chunks(chunks: List[bytes], in_format: Optional[str] = "flac", out_format: str = "flac", **export_kwargs) -> bytes:
+    """Decode every chunk, concatenate them and encode the result. Undecodable chunks are skipped."""
+    segments = []
+    for index, data in enumerate(chunks):
+        try:
+            segments.append(_decode(data, in_format))
+        except Exception as e:
+            logging.warning(f"⚠️ Skipping undecodable audio chunk {index}: {e}")
+
+    if not segments:
+        return b""
+    return _encode(_concatenate(segments), out_format, **export_kwargs)
+
+
+def merge_files(paths: List[str], out_path: str, in_format: Optional[str] = "flac", out_format: str = "flac",
+                peaks_path: Optional[str] = None) -> int:
+    """
+    Decode the parts one at a time and stream their PCM into a single ffmpeg encoder
+    writing `out_path`, so memory holds one part whatever the session length.
+    With `peaks_path`, the waveform peaks are computed from the same decoded parts and
+    written there, so the session is decoded only once.
+    Undecodable parts are skipped. Returns the duration written, in milliseconds.
+    """
+    from api.core.waveform import PeakAccumulator
+
+    peaks = PeakAccumulator() if peaks_path else None
+    encoder = None
+    frame_rate = channels = frames = 0
+    try:
+        for index, path in enumerate(paths):
+            try:
+                segment = AudioSegment.from_file(path, format=in_format)
+            except Exception as e:
+                logging.warning(f"⚠️ Skipping undecodable audio part {index}: {e}")
+                continue
+            if encoder is None:
+                frame_rate, channels = segment.frame_rate, segment.channels
+                encoder = subprocess.Popen(
+                    [AudioSegment.converter, "-y", "-loglevel", "error", "-f", "s16le", "-ar", str(frame_rate),
+                     "-ac", str(channels), "-i", "pipe:0", "-f", out_format, out_path],
+                    stdin=subprocess.PIPE,
+                )
+            segment = segment.set_frame_rate(frame_rate).set_channels(channels).set_sample_width(2)
+            encoder.stdin.write(segment.raw_data)
+            frames += int(segment.frame_count())
+            if peaks:
+                peaks.feed(segment.set_channels(1).raw_data)
+    finally:
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+
+    if encoder is None:
+        return 0
+    if encoder.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with status {encoder.returncode} while merging {len(paths)} parts")
+    duration_ms = frames * 1000 // frame_rate
+    if peaks:
+        with open(peaks_path, "wb") as f:
+            f.write(peaks.finish(frame_rate, duration_ms))
+    return duration_ms
+
+
+def transcode(data: bytes, in_format: Optional[str], out_format: str, frame_rate: Optional[int] = None,
+              channels: Optional[int] = None, **export_kwargs) -> bytes:
+    """Decode, optionally resample / downmix, and re-encode a single audio object."""
+    segment = _decode(data, in_format)
+    if frame_rate:
+        segment = segment.set_frame_rate(frame_rate)
+    if channels:
+        segment = segment.set_channels(channels)
+    return _encode(segment, out_format, **export_kwargs)
+
+
+def probe_duration_ms(data: bytes, in_format: Optional[str] = "flac") -> int:
+    """Duration of an in-memory audio object, in milliseconds."""
+    return len(_decode(data, in_format))
+
+
+def prepend_tail(previous: bytes, current: bytes, overlap_ms: int, in_format: Optional[str] = "flac",
+                 out_format: str = "flac") -> tuple[bytes, int]:
+    """
+    Prepend the last `overlap_ms` of `previous` to `current` so words cut at the chunk
+    boundary are transcribed whole. Returns the new audio and the overlap actually used.
+    """
+    tail = _decode(previous, in_format)[-overlap_ms:]
+    merged = _concatenate([tail, _decode(current, in_format)])
+    return _encode(merged, out_format), len(tail)
+
+
+# --------------------------
+# AUDIO PROCESSING SERVICE
+# --------------------------
+
+class AudioProcessor:
+    """
+    Runs codec work (decode, resample, concatenate, encode) in a process pool
+    so the event loop never blocks on ffmpeg. Concurrency is bounded by a semaphore;
+    any server-side audio job should go through `run`.
+    Arguments and results are pickled to and from the worker (one copy each way):
+    cheap for chunks of a few seconds; whole-session jobs should pass file paths instead.
+    """
+
+    def __init__(self, max_workers: int = AUDIO_WORKERS, max_jobs: int = AUDIO_MAX_JOBS):
+        self.max_workers = max_workers
+        self.max_jobs = max_jobs
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def start(self) -> None:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            self._semaphore = asyncio.Semaphore(self.max_jobs)
+            logging.info(f"✅ Audio process pool started ({self.max_workers} workers, {self.max_jobs} jobs max).")
+
+    async def shutdown(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+            logging.info("Audio process pool stopped.")
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """Run a picklable, module-level function in the pool; its arguments are pickled to the worker."""
+        if self._executor is None:
+            self.start()
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(fn, *args, **kwargs))
+
+    async def merge(self, chunks: List[bytes], in_format: Optional[str] = "flac", out_format: str = "flac", **export_kwargs) -> bytes:
+        return await self.run(merge_chunks, chunks, in_format, out_format, **export_kwargs)
+
+    async def merge_files(self, paths: List[str], out_path: str, in_format: Optional[str] = "flac",
+                          out_format: str = "flac", peaks_path: Optional[str] = None) -> int:
+        return await self.run(merge_files, paths, out_path, in_format, out_format, peaks_path)
+
+    async def transcode(self, data: bytes, in_format: Optional[str], out_format: str, **kwargs) -> bytes:
+        return await self.run(transcode, data, in_format, out_format, **kwargs)
+
+    async def with_overlap(self, previous: bytes, current: bytes, overlap_ms: int) -> tuple[bytes, int]:
+        return await self.run(prepend_tail, previous, current, overlap_ms)
+
+    async def duration_ms(self, data: bytes, in_format: Optional[str] = "flac") -> int:
+        return await self.run(probe_duration_ms, data, in_format)
+
+
+# live path (chunk overlap, durations)
+audio_processor = AudioProcessor()
+# post-session work (session merge and peaks, archival compaction, diarization),
+# kept apart so it never delays live chunks
+background_processor = AudioProcessor(max_workers=BACKGROUND_WORKERS, max_jobs=BACKGROUND_WORKERS)
@@ -0,0 +1,330 @@
+import os
+import json
+import uuid
+import shutil
+import asyncio
+import logging
+import tempfile
+from datetime import datetime, timedelta, timezone
+from fnmatch import fnmatch
+from typing import Awaitable, Callable, List, Optional
+from supabase import AsyncClient
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+# (part file paths, output path) -> writes the combined object to the output path
+Combine = Callable[[List[str], str], Awaitable[None]]
+
+
+# --------------------------
+# APPEND-STYLE UPLOAD
+# --------------------------
+
+class MultipartUpload:
+    """
+    Append-style upload of a single object.
+    Each part is spooled to its own local file as it arrives; with `durable=True` it is also
+    written to the store under `{path}.parts/` so a lost worker does not lose the audio.
+    `complete` builds the object from the part files on disk and streams it to the store,
+    so memory does not grow with the object.
+    """
+
+    def __init__(self, store: "BlobStore", path: str, spool_dir: Optional[str] = None, durable: bool = False):
+        self.store = store
+        self.path = path
+        self.durable = durable
+        self.upload_id = str(uuid.uuid4())
+        self.spool_dir = os.path.join(spool_dir or tempfile.gettempdir(), f"echonote-{self.upload_id}")
+        self.parts_prefix = f"{path}.parts"
+        self.parts: List[int] = []  # size of each part
+        self.size = 0
+        self._lock = asyncio.Lock()
+
+    def _spool_path(self, index: int) -> str:
+        return os.path.join(self.spool_dir, f"{index:06d}")
+
+    def part_key(self, index: int) -> str:
+        """Store path of a durable part."""
+        return f"{self.parts_prefix}/{index:06d}"
+
+    def _write(self, index: int, data: bytes) -> None:
+        os.makedirs(self.spool_dir, exist_ok=True)
+        with open(self._spool_path(index), "wb") as f:
+            f.write(data)
+
+    def _read(self, index: int) -> Optional[bytes]:
+        try:
+            with open(self._spool_path(index), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _concatenate(self, out_path: str) -> None:
+        with open(out_path, "wb") as out:
+            for index in range(len(self.parts)):
+                with open(self._spool_path(index), "rb") as f:
+                    shutil.copyfileobj(f, out)
+
+    async def append(self, data: bytes) -> int:
+        """Append a part and return its index."""
+        async with self._lock:
+            index = len(self.parts)
+            await asyncio.to_thread(self._write, index, data)
+            self.parts.append(len(data))
+            self.size += len(data)
+        if self.durable:
+            try:
+                await self.store.upload(self.part_key(index), data)
+            except Exception as e:
+                # the local spool still has it; only crash recovery is weakened
+                logging.warning(f"⚠️ Could not persist part {index} of {self.path}: {e}")
+        return index
+
+    async def read_part(self, index: int) -> bytes:
+        """Read one part from the local spool, or from the store for durable uploads."""
+        data = await asyncio.to_thread(self._read, index)
+        if data is None and self.durable:
+            data = await self.store.download(self.part_key(index))
+        if data is None:
+            raise FileNotFoundError(f"Part {index} of {self.path} is missing")
+        return data
+
+    async def complete(self, combine: Optional[Combine] = None, content_type: str = "application/octet-stream") -> int:
+        """
+        Write the object and return its size. Without `combine` the part files are concatenated
+        on disk; either way the result is streamed to the store from a local file.
+        """
+        async with self._lock:
+            if not self.parts:
+                await self.abort()
+                return 0
+            out_path = os.path.join(self.spool_dir, "object")
+            if combine is None:
+                await asyncio.to_thread(self._concatenate, out_path)
+            else:
+                await combine([self._spool_path(i) for i in range(len(self.parts))], out_path)
+            size = os.path.getsize(out_path) if os.path.exists(out_path) else 0
+            if size:
+                await self.store.upload_file(self.path, out_path, content_type=content_type)
+            if self.durable:
+                try:
+                    await self.store.remove([self.part_key(i) for i in range(len(self.parts))])
+                except Exception as e:
+                    logging.warning(f"⚠️ Could not remove the parts of {self.path}: {e}")
+            await self.abort()
+            return size
+
+    async def abort(self) -> None:
+        """Drop the local spool. Durable parts stay in the store for recovery."""
+        if os.path.isdir(self.spool_dir):
+            await asyncio.to_thread(shutil.rmtree, self.spool_dir, True)
+
+
+# --------------------------
+# STORE INTERFACE
+# --------------------------
+
+class BlobStore:
+    """Minimal object-store interface used by the API; paths are `{session_id}/{name}`."""
+
+    async def upload(self, path: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        raise NotImplementedError
+
+    async def upload_file(self, path: str, file_path: str, content_type: str = "application/octet-stream") -> None:
+        """Upload a local file; backends override this to stream it instead of reading it whole."""
+        with open(file_path, "rb") as f:
+            data = await asyncio.to_thread(f.read)
+        await self.upload(path, data, content_type=content_type)
+
+    async def download(self, path: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def remove(self, paths: List[str]) -> None:
+        raise NotImplementedError
+
+    async def list(self, prefix: str) -> List[dict]:
+        """Return [{"name": ..., "created_at": datetime}] for objects directly under `prefix`."""
+        raise NotImplementedError
+
+    async def public_url(self, path: str) -> str:
+        raise NotImplementedError
+
+    def create_multipart(self, path: str, durable: bool = False) -> MultipartUpload:
+        return MultipartUpload(self, path, durable=durable)
+
+    # ---- manifest ----
+
+    async def write_manifest(self, session_id: str, manifest: dict) -> None:
+        manifest = {**manifest, "updated_at": datetime.now(timezone.utc).isoformat()}
+        await self.upload(f"{session_id}/manifest.json", json.dumps(manifest).encode(), content_type="application/json")
+
+    async def read_manifest(self, session_id: str) -> dict:
+        try:
+            data = await self.download(f"{session_id}/manifest.json")
+        except Exception:
+            return {}
+        return json.loads(data) if data else {}
+
+
+class SupabaseBlobStore(BlobStore):
+
+    def __init__(self, supabase: AsyncClient, bucket: str):
+        self.supabase = supabase
+        self.bucket = bucket
+
+    @property
+    def _bucket(self):
+        return self.supabase.storage.from_(self.bucket)
+
+    async def upload(self, path: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        await self._bucket.upload(path, data, {"content-type": content_type, "upsert": "true"})
+
+    async def upload_file(self, path: str, file_path: str, content_type: str = "application/octet-stream") -> None:
+        # a file handle is sent as a streamed multipart body, read in chunks
+        with open(file_path, "rb") as f:
+            await self._bucket.upload(path, f, {"content-type": content_type, "upsert": "true"})
+
+    async def download(self, path: str) -> Optional[bytes]:
+        return await self._bucket.download(path)
+
+    async def remove(self, paths: List[str]) -> None:
+        if paths:
+            await self._bucket.remove(paths)
+
+    async def list(self, prefix: str) -> List[dict]:
+        files = await self._bucket.list(path=prefix.rstrip("/") + "/") or []
+        return [
+            {
+                "name": f["name"],
+                "created_at": datetime.fromisoformat(f["created_at"].replace("Z", "+00:00")) if f.get("created_at") else None,
+            }
+            for f in files
+        ]
+
+    async def public_url(self, path: str) -> str:
+        return await self._bucket.get_public_url(path)
+
+
+class LocalBlobStore(BlobStore):
+    """Filesystem-backed store for tests and local development. Appends write in place."""
+
+    def __init__(self, root: str, base_url: str = "/local-storage"):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        os.makedirs(root, exist_ok=True)
+
+    def _full(self, path: str) -> str:
+        full = os.path.abspath(os.path.join(self.root, path))
+        if not full.startswith(os.path.abspath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage path: {path}")
+        return full
+
+    def _write(self, path: str, data: bytes) -> None:
+        full = self._full(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        tmp = f"{full}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, full)
+
+    def _read(self, path: str) -> Optional[bytes]:
+        full = self._full(path)
+        if not os.path.exists(full):
+            return None
+        with open(full, "rb") as f:
+            return f.read()
+
+    def _remove(self, paths: List[str]) -> None:
+        for path in paths:
+            full = self._full(path)
+            if os.path.isdir(full):
+                shutil.rmtree(full)
+            elif os.path.exists(full):
+                os.remove(full)
+
+    def _list(self, prefix: str) -> List[dict]:
+        folder = self._full(prefix.rstrip("/"))
+        if not os.path.isdir(folder):
+            return []
+        return [
+            {
+                "name": entry.name,
+                "created_at": datetime.fromtimestamp(entry.stat().st_mtime, tz=timezone.utc),
+            }
+            for entry in os.scandir(folder)
+        ]
+
+    async def upload(self, path: str, data: bytes, content_type: str = "application/octet-stream") -> None:
+        await asyncio.to_thread(self._write, path, data)
+
+    async def upload_file(self, path: str, file_path: str, content_type: str = "application/octet-stream") -> None:
+        full = self._full(path)
+        os.makedirs(os.path.dirname(full), exist_ok=True)
+        await asyncio.to_thread(shutil.copyfile, file_path, full)
+
+    async def download(self, path: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, path)
+
+    async def remove(self, paths: List[str]) -> None:
+        await asyncio.to_thread(self._remove, paths)
+
+    async def list(self, prefix: str) -> List[dict]:
+        return await asyncio.to_thread(self._list, prefix)
+
+    async def public_url(self, path: str) -> str:
+        return f"{self.base_url}/{path}"
+
+    def create_multipart(self, path: str, durable: bool = False) -> MultipartUpload:
+        # spool next to the target so completion is a local copy on the same disk
+        spool_dir = os.path.dirname(self._full(path))
+        os.makedirs(spool_dir, exist_ok=True)
+        return MultipartUpload(self, path, spool_dir=spool_dir, durable=durable)
+
+
+def init_blob_store(supabase: AsyncClient, backend: str = "supabase", bucket: str = "echonote_bucket",
+                    local_root: str = "./storage") -> BlobStore:
+    if backend == "local":
+        logging.info(f"Using local blob store at {local_root}")
+        return LocalBlobStore(local_root)
+    return SupabaseBlobStore(supabase, bucket)
+
+
+# --------------------------
+# LIFECYCLE RULES
+# --------------------------
+
+class LifecycleRule:
+    """Delete objects whose name matches `pattern` once they are older than `max_age_days`."""
+
+    def __init__(self, pattern: str, max_age_days: float):
+        self.pattern = pattern
+        self.max_age = timedelta(days=max_age_days)
+
+    def expired(self, name: str, created_at: Optional[datetime], now: datetime) -> bool:
+        return created_at is not None and fnmatch(name, self.pattern) and now - created_at >= self.max_age
+
+
+def parse_lifecycle_rules(raw: Optional[str]) -> List[LifecycleRule]:
+    """Parse rules from JSON, e.g. '[{"pattern": "merged.flac", "max_age_days": 365}]'."""
+    if not raw:
+        return []
+    try:
+        return [LifecycleRule(r["pattern"], float(r["max_age_days"])) for r in json.loads(raw)]
+    except (ValueError, KeyError, TypeError) as e:
+        logging.error(f"Invalid STORAGE_LIFECYCLE rules: {e}")
+        return []
+
+
+async def apply_lifecycle(store: BlobStore, session_id: str, rules: List[LifecycleRule]) -> List[str]:
+    """Apply the rules to one session prefix with a single batched delete. Returns removed paths."""
+    if not rules:
+        return []
+    now = datetime.now(timezone.utc)
+    objects = await store.list(session_id)
+    expired = [
+        f"{session_id}/{o['name']}" for o in objects
+        if o["name"] != "manifest.json" and any(rule.expired(o["name"], o["created_at"], now) for rule in rules)
+    ]
+    await store.remove(expired)
+    return expired
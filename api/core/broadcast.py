@@ -0,0 +1,169 @@
+import json
+import asyncio
+import logging
+from typing import Dict, List, Optional, Set, Tuple
+from redis.asyncio import Redis
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+BROADCAST_MAXLEN = 10000      # events kept in the stream for late joiners
+BROADCAST_TTL = 86400         # stream kept one day after the session ends
+
+Event = Tuple[str, dict]      # (stream id, payload)
+
+
+def _stream_key(session_id: str) -> str:
+    return f"broadcast:{session_id}"
+
+
+def _meta_key(session_id: str) -> str:
+    return f"broadcast:{session_id}:meta"
+
+
+def _decode_entries(entries) -> List[Event]:
+    events = []
+    for stream_id, fields in entries:
+        stream_id = stream_id.decode() if isinstance(stream_id, bytes) else stream_id
+        data = fields.get(b"data", fields.get("data"))
+        events.append((stream_id, json.loads(data)))
+    return events
+
+
+# --------------------------
+# SPEAKER SIDE
+# --------------------------
+
+async def start_broadcast(redis_client: Redis, session_id: str, user_id: str, source_lang: str, target_langs: List[str]) -> None:
+    """Mark a session as broadcasting so listeners can join it."""
+    await redis_client.hset(_meta_key(session_id), mapping={
+        "speaker": user_id,
+        "source": source_lang,
+        "targets": ",".join(target_langs),
+        "status": "live",
+    })
+    await redis_client.expire(_meta_key(session_id), BROADCAST_TTL)
+
+
+async def publish_event(redis_client: Redis, session_id: str, event: dict) -> None:
+    """Append a transcript/translation event to the session stream (bounded backlog)."""
+    await redis_client.xadd(
+        _stream_key(session_id),
+        {"data": json.dumps(event)},
+        maxlen=BROADCAST_MAXLEN,
+        approximate=True,
+    )
+
+
+async def end_broadcast(redis_client: Redis, session_id: str) -> None:
+    await publish_event(redis_client, session_id, {"type": "end"})
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.hset(_meta_key(session_id), "status", "ended")
+        pipe.expire(_meta_key(session_id), BROADCAST_TTL)
+        pipe.expire(_stream_key(session_id), BROADCAST_TTL)
+        await pipe.execute()
+
+
+async def get_broadcast(redis_client: Redis, session_id: str) -> dict:
+    meta = await redis_client.hgetall(_meta_key(session_id))
+    return {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in meta.items()
+    }
+
+
+# --------------------------
+# LISTENER SIDE
+# --------------------------
+
+class _SessionReader:
+    """One blocking XREAD loop per session, fanned out to the local listener queues."""
+
+    def __init__(self, redis_client: Redis, session_id: str, position: str):
+        self.redis_client = redis_client
+        self.session_id = session_id
+        self.position = position
+        self.queues: Set[asyncio.Queue] = set()
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        key = _stream_key(self.session_id)
+        while self.queues:
+            try:
+                response = await self.redis_client.xread({key: self.position}, block=5000, count=100)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logging.error(f"Broadcast read failed for session {self.session_id}: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            for _, entries in response or []:
+                events = _decode_entries(entries)
+                if not events:
+                    continue
+                self.position = events[-1][0]
+                for queue in list(self.queues):
+                    for event in events:
+                        queue.put_nowait(event)
+
+
+class BroadcastHub:
+    """
+    Delivers a session's broadcast events to every listener socket of this worker.
+    Transcription and translation run once in the speaker's pipeline; listeners only
+    read the Redis Stream, and share a single reader per session.
+    """
+
+    def __init__(self):
+        self.readers: Dict[str, _SessionReader] = {}
+
+    async def subscribe(self, redis_client: Redis, session_id: str) -> Tuple[asyncio.Queue, List[Event]]:
+        """
+        Register a listener and return (live queue, catch-up backlog).
+        The backlog ends exactly where the live queue starts, so nothing is lost or repeated.
+        """
+        reader = self.readers.get(session_id)
+        if reader is None:
+            last = await redis_client.xrevrange(_stream_key(session_id), count=1)
+            reader = self.readers.get(session_id)  # another listener may have raced us
+            if reader is None:
+                position = _decode_entries(last)[0][0] if last else "0-0"
+                reader = _SessionReader(redis_client, session_id, position)
+                self.readers[session_id] = reader
+
+        queue: asyncio.Queue = asyncio.Queue()
+        reader.queues.add(queue)
+        position = reader.position
+        if reader.task is None or reader.task.done():
+            reader.task = asyncio.create_task(reader.run())
+
+        backlog = []
+        if position != "0-0":
+            backlog = _decode_entries(await redis_client.xrange(_stream_key(session_id), min="-", max=position))
+        return queue, backlog
+
+    def unsubscribe(self, session_id: str, queue: asyncio.Queue) -> None:
+        reader = self.readers.get(session_id)
+        if reader is None:
+            return
+        reader.queues.discard(queue)
+        if not reader.queues:
+            if reader.task:
+                reader.task.cancel()
+            self.readers.pop(session_id, None)
+
+    def listener_count(self, session_id: str) -> int:
+        reader = self.readers.get(session_id)
+        return len(reader.queues) if reader else 0
+
+    async def close(self) -> None:
+        for reader in list(self.readers.values()):
+            if reader.task:
+                reader.task.cancel()
+            for queue in reader.queues:
+                queue.put_nowait(("0-0", {"type": "end", "reason": "server_shutdown"}))
+        self.readers.clear()
+
+
+broadcast_hub = BroadcastHub()
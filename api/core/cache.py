@@ -3,10 +3,14 @@ from redis.asyncio import Redis
 from datetime import datetime
 from typing import Optional, List
 import logging
+from api.core.config import get_settings
 
 # Optional logging setup
 logging.basicConfig(level=logging.INFO)
 
+# idle time after which a transcript leaves Redis (reads refresh it)
+HOT_TRANSCRIPT_TTL = get_settings().hot_transcript_ttl
+
 
 
 # -----------------------
@@ -56,26 +60,89 @@ async def cache_transcript(
     original_text: str,
     translated_text: str
 ) -> None:
-    """Cache transcript chunk in Redis."""
-    user_key = f"user:{user_id}"
-    session_key = f"session:{session_id}"
+    """Cache a final transcript in Redis (hot tier), one key per session."""
     value = {
+        "user_id": user_id,
         "transcript_id": transcript_id,
         "start_time": start_time,
         "original_text": original_text,
         "translated_text": translated_text
     }
-    await redis_client.hset(user_key , session_key, json.dumps(value))
-    await redis_client.expire(user_key, 86400)
+    await redis_client.set(f"transcript:{session_id}", json.dumps(value, default=str), ex=HOT_TRANSCRIPT_TTL)
     
 
 
 async def get_cached_transcript(redis_client: Redis, user_id: str, session_id: str) -> dict:
-    """Retrieve cached transcript for a specific session."""
-    user_key = f"user:{user_id}"
-    session_key = f"session:{session_id}"
-    data = await redis_client.hget(user_key, session_key)
+    """Retrieve cached transcript for a specific session; each read extends its time in the hot tier."""
+    data = await redis_client.getex(f"transcript:{session_id}", ex=HOT_TRANSCRIPT_TTL)
+    value = json.loads(data) if data else {}
+    return value if value.get("user_id") == user_id else {}
+
+
+
+async def cache_segments(redis_client: Redis, session_id: str, segments: dict, ttl: int = 3600) -> None:
+    """Cache the packed, time-aligned segments of a finalized session."""
+    await redis_client.set(f"segments:{session_id}", json.dumps(segments), ex=ttl)
+
+
+async def get_cached_segments(redis_client: Redis, session_id: str) -> dict:
+    data = await redis_client.get(f"segments:{session_id}")
     return json.loads(data) if data else {}
 
 
+# --------------------------
+# CHUNK DEDUPLICATION
+# --------------------------
+
+CHUNK_DEDUP_TTL = 3600
+
+
+def _chunks_key(scope: str) -> str:
+    return f"{scope}:chunks"
+
+
+async def seen_chunk(redis_client: Redis, scope: str, chunk_id: str) -> bool:
+    """Whether a chunk id was already accepted in this dedup scope (read only)."""
+    try:
+        return bool(await redis_client.sismember(_chunks_key(scope), chunk_id))
+    except Exception as e:
+        logging.error(f"Chunk dedup unavailable for {scope}: {e}")
+        return False
+
+
+async def remember_chunk(redis_client: Redis, scope: str, chunk_id: str) -> bool:
+    """
+    Record an accepted chunk id in the dedup set of `scope`: the client's resumable
+    recording (so resends after a reconnect are caught) or, without one, the session.
+    Returns False when the chunk was already accepted.
+    """
+    key = _chunks_key(scope)
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.sadd(key, chunk_id)
+            pipe.expire(key, CHUNK_DEDUP_TTL)
+            added, _ = await pipe.execute()
+    except Exception as e:
+        # without the dedup set, processing twice beats dropping audio
+        logging.error(f"Chunk dedup unavailable for {scope}: {e}")
+        return True
+    return bool(added)
+
+
+# --------------------------
+# FAILED CHUNK RETRY QUEUE
+# --------------------------
+
+async def flag_failed_chunk(redis_client: Redis, session_id: str, chunk_index: int) -> None:
+    """Remember a chunk whose transcription/translation failed so it is retried at finalize time."""
+    key = f"session:{session_id}:retry"
+    await redis_client.sadd(key, chunk_index)
+    await redis_client.expire(key, 86400)
+
 
+async def pop_failed_chunks(redis_client: Redis, session_id: str) -> List[int]:
+    """Return (and clear) the failed chunk indexes of a session, in order."""
+    key = f"session:{session_id}:retry"
+    members = await redis_client.smembers(key)
+    await redis_client.delete(key)
+    return sorted(int(m) for m in members)
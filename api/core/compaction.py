@@ -0,0 +1,124 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timezone
+from supabase import AsyncClient
+from redis.asyncio import Redis
+from api.core.audio import background_processor
+from api.core.blob_store import BlobStore
+from api.core.config import get_settings
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+COMPACTION_QUEUE = "compaction:queue"
+ORIGINALS_KEY = "compaction:originals"   # sorted set: "session_id|path" scored by expiry timestamp
+
+AUDIO_MEDIA_TYPES = {
+    "flac": "audio/flac",
+    "opus": "audio/ogg",
+    "ogg": "audio/ogg",
+    "mp3": "audio/mpeg",
+    "webm": "audio/webm",
+}
+
+
+def media_type_for(path: str) -> str:
+    return AUDIO_MEDIA_TYPES.get(path.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+
+async def enqueue_compaction(redis_client: Redis, session_id: str) -> None:
+    """Schedule the archival re-encode of a finalized session."""
+    await redis_client.lpush(COMPACTION_QUEUE, session_id)
+
+
+async def compact_session(supabase: AsyncClient, store: BlobStore, redis_client: Redis, session_id: str) -> dict:
+    """
+    Re-encode the merged session audio with the archival profile (e.g. Opus 24 kbps mono),
+    point the manifest at the archived object and schedule the original for deletion
+    after the retention window. Both sizes are recorded.
+    """
+    settings = get_settings()
+    manifest = await store.read_manifest(session_id)
+    original_name = manifest.get("audio")
+    archive_name = f"session.{settings.archive_format}"
+    if not original_name or original_name == archive_name:
+        return manifest
+
+    original = await store.download(f"{session_id}/{original_name}")
+    if not original:
+        return manifest
+
+    # whole-session re-encode: the background pool, so live chunks keep the audio pool
+    archived = await background_processor.transcode(
+        original,
+        in_format=original_name.rsplit(".", 1)[-1],
+        out_format=settings.archive_format,
+        frame_rate=settings.archive_frame_rate,
+        channels=settings.archive_channels,
+        codec=settings.archive_codec,
+        bitrate=settings.archive_bitrate,
+    )
+    await store.upload(f"{session_id}/{archive_name}", archived, content_type=media_type_for(archive_name))
+
+    expires_at = time.time() + settings.original_retention_days * 86400
+    manifest = {
+        **manifest,
+        "audio": archive_name,
+        "original": original_name,
+        "original_expires_at": datetime.fromtimestamp(expires_at, tz=timezone.utc).isoformat(),
+        "original_bytes": len(original),
+        "archived_bytes": len(archived),
+    }
+    await store.write_manifest(session_id, manifest)
+    await redis_client.zadd(ORIGINALS_KEY, {f"{session_id}|{session_id}/{original_name}": expires_at})
+
+    try:
+        await supabase.table("sessions").update({
+            "audio_bytes_original": len(original),
+            "audio_bytes_archived": len(archived),
+        }).eq("id", session_id).execute()
+    except Exception as e:
+        logging.warning(f"Could not record audio sizes for session {session_id}: {e}")
+
+    logging.info(f"🗜️ Session {session_id} compacted: {len(original)} -> {len(archived)} bytes")
+    return manifest
+
+
+async def purge_expired_originals(store: BlobStore, redis_client: Redis) -> int:
+    """Delete the originals whose retention window has passed, in one batched remove."""
+    expired = await redis_client.zrangebyscore(ORIGINALS_KEY, 0, time.time(), start=0, num=500)
+    if not expired:
+        return 0
+
+    members = [m.decode() if isinstance(m, bytes) else m for m in expired]
+    await store.remove([m.split("|", 1)[1] for m in members])
+    for member in members:
+        session_id = member.split("|", 1)[0]
+        manifest = await store.read_manifest(session_id)
+        if manifest.get("original"):
+            manifest.pop("original")
+            manifest.pop("original_expires_at", None)
+            await store.write_manifest(session_id, manifest)
+    await redis_client.zrem(ORIGINALS_KEY, *members)
+    return len(members)
+
+
+async def compaction_loop(app) -> None:
+    """Background job: drain the compaction queue, then purge expired originals."""
+    interval = get_settings().compaction_interval
+    while True:
+        try:
+            while True:
+                session_id = await app.state.redis_client.rpop(COMPACTION_QUEUE)
+                if session_id is None:
+                    break
+                session_id = session_id.decode() if isinstance(session_id, bytes) else session_id
+                try:
+                    await compact_session(app.state.supabase, app.state.blob_store, app.state.redis_client, session_id)
+                except Exception as e:
+                    logging.error(f"Compaction of session {session_id} failed: {e}")
+            await purge_expired_originals(app.state.blob_store, app.state.redis_client)
+        except Exception as e:
+            logging.error(f"Compaction run failed: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,132 @@
+import os
+import time
+from functools import lru_cache
+from typing import Literal, Optional
+from dotenv import load_dotenv
+from pydantic import BaseModel, Field, ValidationError
+import logging
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+
+
+def _process_start() -> float:
+    """
+    Creation time of this process on the `time.monotonic()` clock, so the cold-start
+    measurement covers interpreter startup and the imports made before this module.
+    """
+    now = time.monotonic()
+    try:
+        with open("/proc/self/stat") as f:
+            # the command name may hold spaces; starttime (field 22) is the 20th field after it
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        age = time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+        return now - max(age, 0.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return now - max(time.time() - psutil.Process().create_time(), 0.0)
+    except Exception:
+        return now
+
+
+# reference point for the cold-start measurement
+PROCESS_START = _process_start()
+
+
+class Settings(BaseModel):
+    """All runtime configuration, read from the environment (and .env) once and validated."""
+
+    # upstreams
+    groq_api_key: Optional[str] = None
+    supabase_url: Optional[str] = None
+    supabase_key: Optional[str] = None
+    supabase_bucket: str = "echonote_bucket"
+    redis_host: Optional[str] = None
+    redis_password: Optional[str] = None
+    redis_ssl: bool = True
+
+    # transcript tiers: Redis (idle TTL) -> transcripts table -> compressed archive
+    hot_transcript_ttl: int = Field(86400, gt=0)
+    cold_after_days: Optional[float] = Field(None, gt=0)
+    archive_batch_size: int = Field(200, gt=0)
+    retention_interval: int = Field(3600, gt=0)
+
+    # storage
+    storage_backend: Literal["supabase", "local"] = "supabase"
+    local_storage_root: str = "./storage"
+    storage_lifecycle: Optional[str] = None
+    lifecycle_interval: int = Field(3600, gt=0)
+    # local to the host; backfilled at startup when empty (see api/core/search.py)
+    search_index_path: str = "./search_index.db"
+
+    # audio processing
+    audio_workers: int = Field(2, gt=0)
+    audio_max_jobs: int = Field(4, gt=0)
+    overlap_ms: int = Field(1000, ge=0)
+    prompt_chars: int = Field(200, ge=0)
+
+    # archival compaction of session audio
+    compaction_enabled: bool = True
+    compaction_interval: int = Field(30, gt=0)
+    archive_format: str = "opus"
+    archive_codec: str = "libopus"
+    archive_bitrate: str = "24k"
+    archive_frame_rate: int = Field(16000, gt=0)
+    archive_channels: int = Field(1, gt=0)
+    original_retention_days: float = Field(7.0, ge=0)
+
+    # resilience budgets (seconds)
+    groq_timeout: float = Field(5.0, gt=0)
+    transcription_budget: float = Field(6.0, gt=0)
+    translation_timeout: float = Field(3.0, gt=0)
+    translation_budget: float = Field(4.0, gt=0)
+    translation_cache_ttl: int = Field(86400, gt=0)
+    translation_workers: int = Field(8, gt=0)
+
+    # post-session speaker diarization
+    diarization_enabled: bool = False
+    diarization_threshold: float = Field(0.25, ge=-1, le=1)
+    diarization_max_speakers: int = Field(8, gt=0)
+    background_workers: int = Field(1, gt=0)
+
+    # fairness: rate limits and quotas per user
+    max_sockets_per_user: int = Field(3, gt=0)
+    chunk_rate_limit: int = Field(60, gt=0)          # chunks per sliding minute
+    monthly_quota_minutes: Optional[float] = Field(None, ge=0)
+    usage_flush_interval: float = Field(10.0, gt=0)
+    admin_user_ids: Optional[str] = None
+
+    # session traces for offline replay: off, opt-in (?trace=1) or all
+    trace_mode: Literal["off", "opt-in", "all"] = "off"
+    trace_dir: str = "./traces"
+    trace_max_age_days: float = Field(7.0, gt=0)
+    trace_max_mb: int = Field(2048, gt=0)
+
+    # profiling: loop lag monitor, sampling profiler endpoint, per-chunk spans
+    profiling_enabled: bool = False
+    loop_lag_interval: float = Field(0.5, gt=0)
+    loop_lag_warn_ms: float = Field(100.0, gt=0)
+    slow_chunk_ms: float = Field(3000.0, gt=0)
+    profile_max_seconds: float = Field(30.0, gt=0)
+
+    # startup
+    cold_start_budget: float = Field(5.0, gt=0)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Load .env once and build the validated settings; later calls reuse them."""
+    load_dotenv()
+    values = {
+        name: os.environ[name.upper()]
+        for name in Settings.model_fields
+        if name.upper() in os.environ
+    }
+    try:
+        return Settings(**values)
+    except ValidationError as e:
+        logging.error(f"❌ Invalid configuration: {e}")
+        raise
@@ -0,0 +1,230 @@
+import io
+from typing import Optional, Tuple
+import numpy as np
+from pydub import AudioSegment
+
+# Speaker diarization of the merged session audio (pure NumPy, runs in the background pool).
+# The post-session queue lives in api/core/diarization_queue.py, so the API process
+# only imports NumPy once a session is actually diarized.
+
+SAMPLE_RATE = 16000
+FRAME = 400            # 25 ms analysis frames
+HOP = 160              # 10 ms hop
+N_FFT = 512
+N_MELS = 40
+WINDOW_FRAMES = 150    # 1.5 s embedding windows
+WINDOW_HOP = 75        # 50 % overlap
+BLOCK_FRAMES = 6000    # frames processed per block, bounds memory on long sessions
+MAX_CLUSTER_INPUT = 400
+
+
+# --------------------------
+# FEATURES (pure NumPy, run in the background pool)
+# --------------------------
+
+def _mel_filterbank(sample_rate: int = SAMPLE_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mels = np.linspace(hz_to_mel(60.0), hz_to_mel(sample_rate / 2 * 0.95), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mels) / sample_rate).astype(int)
+    bank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return bank
+
+
+def log_mel_frames(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Log-mel features and log energy of 25 ms frames every 10 ms, computed block by block."""
+    samples = samples.astype(np.float32) / 32768.0
+    if len(samples) < FRAME:
+        return np.zeros((0, N_MELS), dtype=np.float32), np.zeros(0, dtype=np.float32)
+
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::HOP]
+    window = np.hamming(FRAME).astype(np.float32)
+    bank = _mel_filterbank()
+
+    features, energies = [], []
+    for start in range(0, len(frames), BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES] * window
+        power = np.abs(np.fft.rfft(block, n=N_FFT, axis=1)) ** 2
+        features.append(np.log(power @ bank.T + 1e-8).astype(np.float32))
+        energies.append(10 * np.log10(np.sum(block ** 2, axis=1) + 1e-10).astype(np.float32))
+    return np.concatenate(features), np.concatenate(energies)
+
+
+def voiced_mask(energy_db: np.ndarray) -> np.ndarray:
+    """Energy-based voice activity: frames close enough to the loud part of the recording."""
+    if len(energy_db) == 0:
+        return np.zeros(0, dtype=bool)
+    loud, quiet = np.percentile(energy_db, 95), np.percentile(energy_db, 10)
+    return (energy_db > loud - 35.0) & (energy_db > quiet + 6.0)
+
+
+def window_embeddings(features: np.ndarray, voiced: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Mean/std statistics of the voiced frames of each 1.5 s window, from cumulative sums
+    (no per-window loop). Returns (L2-normalized embeddings, first frame of each kept window).
+    """
+    if len(features) < WINDOW_FRAMES:
+        return np.zeros((0, 2 * N_MELS), dtype=np.float32), np.zeros(0, dtype=int)
+
+    weights = voiced.astype(np.float64)[:, None]
+    pad = np.zeros((1, features.shape[1]))
+    s1 = np.concatenate([pad, np.cumsum(features * weights, axis=0)])
+    s2 = np.concatenate([pad, np.cumsum(features ** 2 * weights, axis=0)])
+    n = np.concatenate([[0.0], np.cumsum(voiced)])
+
+    starts = np.arange(0, len(features) - WINDOW_FRAMES + 1, WINDOW_HOP)
+    ends = starts + WINDOW_FRAMES
+    count = n[ends] - n[starts]
+    keep = count >= WINDOW_FRAMES // 2
+    starts, ends, count = starts[keep], ends[keep], count[keep][:, None]
+    if len(starts) == 0:
+        return np.zeros((0, 2 * N_MELS), dtype=np.float32), starts
+
+    mean = (s1[ends] - s1[starts]) / count
+    std = np.sqrt(np.maximum((s2[ends] - s2[starts]) / count - mean ** 2, 1e-8))
+    embeddings = np.hstack([mean, std])
+
+    # session-level normalization removes the channel, then unit length for cosine similarity
+    embeddings = (embeddings - embeddings.mean(axis=0)) / (embeddings.std(axis=0) + 1e-8)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True) + 1e-8
+    return embeddings.astype(np.float32), starts
+
+
+# --------------------------
+# CLUSTERING
+# --------------------------
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return x / (np.linalg.norm(x, axis=1, keepdims=True) + 1e-8)
+
+
+def _reduce(embeddings: np.ndarray, weights: np.ndarray, k: int, iterations: int = 10) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Spherical k-means down to `k` weighted centroids; returns (centroids, weights, assignment)."""
+    step = len(embeddings) / k
+    centroids = embeddings[(np.arange(k) * step).astype(int)]
+    for _ in range(iterations):
+        assignment = np.argmax(embeddings @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, embeddings * weights[:, None])
+        centroids = _normalize(sums)
+    totals = np.bincount(assignment, weights=weights, minlength=k)
+    used = totals > 0
+    remap = np.cumsum(used) - 1
+    return centroids[used], totals[used], remap[assignment]
+
+
+def cluster(embeddings: np.ndarray, weights: np.ndarray, threshold: float, max_speakers: int) -> np.ndarray:
+    """
+    Agglomerative clustering on cosine similarity (weighted centroid linkage).
+    Merging stops when no pair is more similar than `threshold`, but never leaves
+    more than `max_speakers` clusters. Labels are numbered by first appearance.
+    """
+    if len(embeddings) == 0:
+        return np.zeros(0, dtype=int)
+
+    assignment = np.arange(len(embeddings))
+    if len(embeddings) > MAX_CLUSTER_INPUT:
+        embeddings, weights, assignment = _reduce(embeddings, weights, MAX_CLUSTER_INPUT)
+
+    sums = embeddings * weights[:, None]
+    active = np.ones(len(embeddings), dtype=bool)
+    labels = np.arange(len(embeddings))
+    normed = _normalize(sums)
+    sim = normed @ normed.T
+    np.fill_diagonal(sim, -np.inf)
+
+    while active.sum() > 1:
+        i, j = np.unravel_index(np.argmax(sim), sim.shape)
+        if sim[i, j] < threshold and active.sum() <= max_speakers:
+            break
+        sums[i] += sums[j]
+        active[j] = False
+        labels[labels == j] = i
+        sim[j, :], sim[:, j] = -np.inf, -np.inf
+        row = _normalize(sums[i:i + 1]) @ _normalize(sums).T
+        row[0, ~active], row[0, i] = -np.inf, -np.inf
+        sim[i, :], sim[:, i] = row[0], row[0]
+
+    labels = labels[assignment]
+    _, first = np.unique(labels, return_index=True)
+    order = np.argsort(np.argsort(first))
+    return order[np.searchsorted(np.unique(labels), labels)]
+
+
+# --------------------------
+# DIARIZATION
+# --------------------------
+
+def diarize_pcm(samples: np.ndarray, threshold: float = 0.25, max_speakers: int = 8,
+                change_threshold: float = 0.6) -> dict:
+    """
+    Speaker turns of 16 kHz mono int16 PCM, columnar:
+    {"start_ms": [...], "end_ms": [...], "speaker": [...], "count": n}.
+    Consecutive similar windows are first grouped (speaker change detection),
+    then the groups are clustered into speakers.
+    """
+    features, energy = log_mel_frames(samples)
+    embeddings, starts = window_embeddings(features, voiced_mask(energy))
+    turns = {"start_ms": [], "end_ms": [], "speaker": [], "count": 0}
+    if len(embeddings) == 0:
+        return turns
+
+    # group consecutive windows until the voice changes
+    adjacent = np.sum(embeddings[1:] * embeddings[:-1], axis=1)
+    contiguous = np.diff(starts) <= WINDOW_HOP
+    group = np.concatenate([[0], np.cumsum(~((adjacent >= change_threshold) & contiguous))])
+    counts = np.bincount(group).astype(np.float64)
+    sums = np.zeros((len(counts), embeddings.shape[1]))
+    np.add.at(sums, group, embeddings)
+
+    speakers = cluster(_normalize(sums), counts, threshold, max_speakers)[group]
+
+    frame_ms = HOP * 1000 // SAMPLE_RATE
+    window_start = starts * frame_ms
+    window_end = (starts + WINDOW_FRAMES) * frame_ms
+    change = np.concatenate([[True], (speakers[1:] != speakers[:-1]) | ~contiguous])
+    first = np.flatnonzero(change)
+    last = np.concatenate([first[1:] - 1, [len(speakers) - 1]])
+
+    start_ms, end_ms = window_start[first], window_end[last]
+    # overlapping windows: a turn ends where the next one starts
+    end_ms[:-1] = np.minimum(end_ms[:-1], start_ms[1:])
+    return {
+        "start_ms": start_ms.tolist(),
+        "end_ms": end_ms.tolist(),
+        "speaker": speakers[first].tolist(),
+        "count": int(speakers.max()) + 1,
+    }
+
+
+def diarize(data: bytes, in_format: Optional[str] = "flac", threshold: float = 0.25, max_speakers: int = 8) -> dict:
+    """Decode session audio and diarize it (runs in the background pool)."""
+    segment = AudioSegment.from_file(io.BytesIO(data), format=in_format) \
+        .set_channels(1).set_frame_rate(SAMPLE_RATE).set_sample_width(2)
+    return diarize_pcm(np.frombuffer(segment.raw_data, dtype=np.int16), threshold, max_speakers)
+
+
+def assign_speakers(columns: dict, turns: dict) -> list:
+    """Speaker of each transcript segment: the turn containing the segment midpoint (or the nearest)."""
+    if not turns.get("start_ms") or not columns.get("start_ms"):
+        return [-1] * len(columns.get("start_ms", []))
+    turn_start = np.asarray(turns["start_ms"])
+    turn_end = np.asarray(turns["end_ms"])
+    mid = (np.asarray(columns["start_ms"]) + np.asarray(columns["end_ms"])) // 2
+
+    idx = np.clip(np.searchsorted(turn_start, mid, side="right") - 1, 0, len(turn_start) - 1)
+    # in a gap, the following turn may be closer than the previous one
+    following = np.minimum(idx + 1, len(turn_start) - 1)
+    closer = (mid >= turn_end[idx]) & (turn_start[following] - mid < mid - turn_end[idx])
+    idx = np.where(closer, following, idx)
+    return np.asarray(turns["speaker"])[idx].tolist()
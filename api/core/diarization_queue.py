@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from supabase import AsyncClient
+from redis.asyncio import Redis
+from api.core.audio import background_processor
+from api.core.blob_store import BlobStore
+from api.core.config import get_settings
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+DIARIZATION_QUEUE = "diarization:queue"
+
+
+# --------------------------
+# POST-SESSION STAGE
+# --------------------------
+
+async def enqueue_diarization(redis_client: Redis, session_id: str) -> None:
+    await redis_client.lpush(DIARIZATION_QUEUE, session_id)
+
+
+async def diarize_session(supabase: AsyncClient, store: BlobStore, redis_client: Redis, session_id: str) -> dict:
+    """
+    Diarize the merged session audio and attach the speaker labels to the final transcript:
+    `segments.speaker` (one small int per segment) and `segments.speakers` (the turns).
+    """
+    settings = get_settings()
+    manifest = await store.read_manifest(session_id)
+    audio_name = manifest.get("audio")
+    if not audio_name:
+        return {}
+    audio = await store.download(f"{session_id}/{audio_name}")
+    if not audio:
+        return {}
+
+    from api.core.diarization import diarize, assign_speakers  # NumPy, loaded on first use
+
+    turns = await background_processor.run(
+        diarize, audio, audio_name.rsplit(".", 1)[-1],
+        settings.diarization_threshold, settings.diarization_max_speakers,
+    )
+
+    response = await supabase.table("transcripts").select("transcript_id, segments") \
+        .eq("session_id", session_id).eq("chunk_index", -1).execute()
+    if not response.data:
+        return turns
+    columns = response.data[0].get("segments") or {}
+    columns["speaker"] = assign_speakers(columns, turns)
+    columns["speakers"] = turns
+
+    await supabase.table("transcripts").update({"segments": columns}) \
+        .eq("session_id", session_id).eq("chunk_index", -1).execute()
+    await redis_client.delete(f"segments:{session_id}")
+    logging.info(f"🗣️ Session {session_id} diarized: {turns['count']} speakers, {len(turns['speaker'])} turns")
+    return turns
+
+
+async def diarization_loop(app) -> None:
+    """Background job: drain the diarization queue, one session at a time."""
+    interval = get_settings().compaction_interval
+    while True:
+        try:
+            while True:
+                session_id = await app.state.redis_client.rpop(DIARIZATION_QUEUE)
+                if session_id is None:
+                    break
+                session_id = session_id.decode() if isinstance(session_id, bytes) else session_id
+                try:
+                    await diarize_session(app.state.supabase, app.state.blob_store, app.state.redis_client, session_id)
+                except Exception as e:
+                    logging.error(f"Diarization of session {session_id} failed: {e}")
+        except Exception as e:
+            logging.error(f"Diarization run failed: {e}")
+        await asyncio.sleep(interval)
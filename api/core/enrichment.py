@@ -0,0 +1,232 @@
+import re
+import json
+import math
+import logging
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from supabase import AsyncClient
+from redis.asyncio import Redis
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+KEYWORDS = 8
+SUMMARY_SENTENCES = 2
+SUMMARY_CHARS = 240
+TITLE_CHARS = 60
+RECENT_SESSIONS = 100         # previews kept per user, the latest by start time
+PREVIEWS_TTL = 30 * 86400     # previews of an inactive user expire
+DF_TTL = 90 * 86400           # document frequencies of an inactive user expire
+DF_MAX_TERMS = 20000          # per user; past it the rarest terms are pruned down to 90 %
+
+STOPWORDS = {
+    "fr": set("""
+        alors au aucun aussi autre avec avoir bon car ce cela ces cet cette ceux chaque ci comme comment dans
+        des donc dont elle elles en encore est et été être eu fait faire fois font hors ici il ils je juste la le
+        les leur leurs lui mais me même mes moi mon ne ni nos notre nous on ont ou où par parce pas peu peut plus
+        pour pourquoi quand que quel quelle quelles quels qui sa sans se ses seulement si sien son sont sous
+        sur ta tandis te tellement tes ton tous tout toute toutes très tu un une vos votre vous vu ça était
+        avait aux cest jai quil quon cette bien faut voilà donc euh
+    """.split()),
+    "en": set("""
+        a about above after again all also am an and any are as at be because been before being below between
+        both but by can could did do does doing down during each few for from further had has have having he her
+        here hers him his how i if in into is it its itself just me more most my no nor not now of off on once only
+        or other our out over own same she should so some such than that the their them then there these they
+        this those through to too under until up very was we were what when where which while who whom why will
+        with would you your yeah okay like really um uh
+    """.split()),
+}
+
+
+def _df_key(user_id: str) -> str:
+    return f"df:{user_id}"
+
+
+def _docs_key(user_id: str) -> str:
+    return f"df:{user_id}:docs"
+
+
+def _previews_key(user_id: str) -> str:
+    return f"user:{user_id}:previews"
+
+
+def _recent_key(user_id: str) -> str:
+    # sorted set of session ids scored by start time
+    return f"user:{user_id}:recent_sessions"
+
+
+def _start_score(started_at) -> float:
+    try:
+        return datetime.fromisoformat(str(started_at).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+# --------------------------
+# TEXT HELPERS
+# --------------------------
+
+def tokenize(text: str, lang: Optional[str] = None) -> List[str]:
+    """Lowercased word tokens of 3+ letters, without the stopwords of `lang` (French and English by default)."""
+    stopwords = STOPWORDS.get(lang or "", STOPWORDS["fr"] | STOPWORDS["en"])
+    return [t for t in re.findall(r"[^\W\d_]{3,}", text.lower()) if t not in stopwords]
+
+
+def split_sentences(text: str) -> List[str]:
+    return [s.strip() for s in re.split(r"(?<=[.!?…])\s+", text) if len(s.strip()) > 1]
+
+
+def shorten(text: str, limit: int) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit].rsplit(" ", 1)[0].rstrip(",;:") + "…"
+
+
+# --------------------------
+# TF-IDF OVER THE USER'S CORPUS
+# --------------------------
+
+async def update_document_frequencies(redis_client: Redis, user_id: str, terms: set) -> tuple[int, Dict[str, int]]:
+    """
+    Count this session in the user's document frequencies (one pipeline) and return
+    (number of documents, df of each term) including it. The hash is bounded: it expires
+    after DF_TTL without sessions and its rarest terms are pruned past DF_MAX_TERMS.
+    """
+    terms = sorted(terms)
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for term in terms:
+            pipe.hincrby(_df_key(user_id), term, 1)
+        pipe.incr(_docs_key(user_id))
+        pipe.expire(_df_key(user_id), DF_TTL)
+        pipe.expire(_docs_key(user_id), DF_TTL)
+        pipe.hlen(_df_key(user_id))
+        results = await pipe.execute()
+
+    if results[-1] > DF_MAX_TERMS:
+        await prune_document_frequencies(redis_client, user_id, int(DF_MAX_TERMS * 0.9))
+    return int(results[len(terms)]), {term: int(df) for term, df in zip(terms, results)}
+
+
+async def prune_document_frequencies(redis_client: Redis, user_id: str, keep: int) -> int:
+    """
+    Drop the rarest terms so at most `keep` remain. A pruned term scores as if seen once,
+    which is what a rare term is anyway. Returns the number of terms removed.
+    """
+    df = await redis_client.hgetall(_df_key(user_id))
+    if len(df) <= keep:
+        return 0
+    rarest = sorted(df, key=lambda term: int(df[term]))[:len(df) - keep]
+    for start in range(0, len(rarest), 1000):
+        await redis_client.hdel(_df_key(user_id), *rarest[start:start + 1000])
+    logging.info(f"Pruned {len(rarest)} rare terms from the document frequencies of user {user_id}")
+    return len(rarest)
+
+
+def score_terms(counts: Counter, documents: int, df: Dict[str, int]) -> Dict[str, float]:
+    """Sublinear tf × smoothed idf."""
+    return {
+        term: (1 + math.log(tf)) * (math.log((1 + documents) / (1 + df.get(term, 1))) + 1)
+        for term, tf in counts.items()
+    }
+
+
+def summarize(text: str, weights: Dict[str, float], lang: Optional[str] = None) -> dict:
+    """
+    Extractive title and summary: sentences are scored by the tf-idf weight of their terms
+    (length-normalized); the best ones are kept in their original order.
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return {"title": "", "summary": ""}
+
+    scores = []
+    for sentence in sentences:
+        terms = tokenize(sentence, lang)
+        scores.append(sum(weights.get(t, 0.0) for t in terms) / math.sqrt(len(terms) + 1))
+
+    ranked = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+    chosen = sorted(ranked[:SUMMARY_SENTENCES])
+    return {
+        "title": shorten(sentences[ranked[0]].rstrip(".!?…"), TITLE_CHARS),
+        "summary": shorten(" ".join(sentences[i] for i in chosen), SUMMARY_CHARS),
+    }
+
+
+# --------------------------
+# PREVIEWS
+# --------------------------
+
+async def cache_preview(redis_client: Redis, user_id: str, preview: dict) -> None:
+    """
+    Cache a session preview, ranked by start time. Only the RECENT_SESSIONS latest previews
+    of a user are kept (older ones are dropped from the hash too) and both keys expire
+    after PREVIEWS_TTL without writes.
+    """
+    previews_key, recent_key = _previews_key(user_id), _recent_key(user_id)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.hset(previews_key, preview["session_id"], json.dumps(preview, ensure_ascii=False))
+        pipe.zadd(recent_key, {preview["session_id"]: _start_score(preview.get("started_at"))})
+        pipe.zrange(recent_key, 0, -RECENT_SESSIONS - 1)
+        pipe.zremrangebyrank(recent_key, 0, -RECENT_SESSIONS - 1)
+        pipe.expire(previews_key, PREVIEWS_TTL)
+        pipe.expire(recent_key, PREVIEWS_TTL)
+        results = await pipe.execute()
+    dropped = results[2]
+    if dropped:
+        await redis_client.hdel(previews_key, *dropped)
+
+
+async def get_recent_session_ids(redis_client: Redis, user_id: str, count: int) -> List[str]:
+    """Ids of the user's latest cached previews, newest first."""
+    ids = await redis_client.zrevrange(_recent_key(user_id), 0, count - 1)
+    return [sid.decode() if isinstance(sid, bytes) else sid for sid in ids]
+
+
+async def get_cached_previews(redis_client: Redis, user_id: str, session_ids: List[str]) -> Dict[str, dict]:
+    if not session_ids:
+        return {}
+    values = await redis_client.hmget(_previews_key(user_id), session_ids)
+    return {sid: json.loads(v) for sid, v in zip(session_ids, values) if v}
+
+
+async def enrich_session(
+    supabase: AsyncClient,
+    redis_client: Redis,
+    user_id: str,
+    session_id: str,
+    original_text: str,
+    started_at: str,
+    source_lang: Optional[str] = None,
+    target_lang: Optional[str] = None,
+) -> dict:
+    """
+    Post-finalize enrichment: title, short summary and top keywords of a session,
+    stored on the final transcript row and cached as the session's list-view preview.
+    """
+    counts = Counter(tokenize(original_text, source_lang))
+    documents, df = await update_document_frequencies(redis_client, user_id, set(counts))
+    weights = score_terms(counts, documents, df)
+    keywords = sorted(weights, key=weights.get, reverse=True)[:KEYWORDS]
+
+    preview = {
+        "session_id": session_id,
+        "started_at": str(started_at),
+        "language_source": source_lang,
+        "language_target": target_lang,
+        **summarize(original_text, weights, source_lang),
+        "keywords": keywords,
+    }
+
+    try:
+        await supabase.table("transcripts").update({
+            "title": preview["title"],
+            "summary": preview["summary"],
+            "keywords": keywords,
+        }).eq("session_id", session_id).eq("chunk_index", -1).execute()
+    except Exception as e:
+        logging.warning(f"Could not store the summary of session {session_id}: {e}")
+
+    await cache_preview(redis_client, user_id, preview)
+    return preview
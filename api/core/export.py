@@ -0,0 +1,279 @@
+import io
+import json
+import time
+import uuid
+import logging
+from datetime import datetime, timezone
+from typing import AsyncGenerator, Iterator, List, Optional, Tuple
+from supabase import AsyncClient
+from redis.asyncio import Redis
+from api.core.blob_store import BlobStore
+from api.core.retention import load_final_transcripts
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+EXPORT_PAGE_SIZE = 50          # sessions fetched per database round-trip
+EXPORT_JOB_PART_SIZE = 200     # sessions per archive part written by background jobs
+EXPORT_JOB_TTL = 7 * 86400
+EXPORT_JOB_LEASE = 120         # seconds; renewed while the runner writes
+
+
+# --------------------------
+# SUBTITLES
+# --------------------------
+
+def _timestamp(ms: int, separator: str) -> str:
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}{separator}{ms:03d}"
+
+
+def iter_srt(segments: dict) -> Iterator[str]:
+    """SubRip cues from packed session segments, generated lazily."""
+    for i, (start, end, text) in enumerate(zip(segments.get("start_ms", []), segments.get("end_ms", []), segments.get("text", [])), 1):
+        yield f"{i}\n{_timestamp(start, ',')} --> {_timestamp(end, ',')}\n{text}\n\n"
+
+
+def iter_vtt(segments: dict) -> Iterator[str]:
+    """WebVTT cues from packed session segments, generated lazily."""
+    yield "WEBVTT\n\n"
+    for start, end, text in zip(segments.get("start_ms", []), segments.get("end_ms", []), segments.get("text", [])):
+        yield f"{_timestamp(start, '.')} --> {_timestamp(end, '.')}\n{text}\n\n"
+
+
+# --------------------------
+# SESSION ITERATION
+# --------------------------
+
+async def iter_user_sessions(
+    supabase: AsyncClient,
+    user_id: str,
+    session_ids: Optional[List[str]] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None,
+    store: Optional[BlobStore] = None,
+) -> AsyncGenerator[Tuple[dict, dict], None]:
+    """
+    Yield (session, final transcript) pairs of a user, oldest first, one page at a time.
+    `after` is the `started_at` of the last exported session and acts as the resume cursor.
+    With a `store`, archived transcripts are read from the cold tier.
+    """
+    cursor, sent = after, 0
+    while True:
+        query = supabase.table("sessions").select("*").eq("user_id", user_id)
+        if session_ids:
+            query = query.in_("id", session_ids)
+        if cursor:
+            query = query.gt("started_at", cursor)
+        page_size = EXPORT_PAGE_SIZE if limit is None else min(EXPORT_PAGE_SIZE, limit - sent)
+        sessions = (await query.order("started_at").limit(page_size).execute()).data or []
+        if not sessions:
+            return
+
+        if store is not None:
+            by_session = await load_final_transcripts(supabase, store, sessions)
+        else:
+            transcripts = await supabase.table("transcripts").select("*") \
+                .in_("session_id", [s["id"] for s in sessions]) \
+                .eq("chunk_index", -1).execute()
+            by_session = {t["session_id"]: t for t in transcripts.data or []}
+
+        for session in sessions:
+            yield session, by_session.get(session["id"], {})
+        sent += len(sessions)
+        cursor = sessions[-1]["started_at"]
+        if len(sessions) < page_size or (limit is not None and sent >= limit):
+            return
+
+
+def _session_record(session: dict, transcript: dict) -> dict:
+    return {
+        "cursor": session.get("started_at"),
+        "session_id": session["id"],
+        "started_at": session.get("started_at"),
+        "ended_at": session.get("ended_at"),
+        "language_source": session.get("language_source"),
+        "language_target": session.get("language_target"),
+        "original_text": transcript.get("original_text", ""),
+        "translated_text": transcript.get("translated_text", ""),
+        "translations": transcript.get("translations") or {},
+    }
+
+
+# --------------------------
+# STREAMING FORMATS
+# --------------------------
+
+async def stream_jsonl(supabase: AsyncClient, user_id: str, store: Optional[BlobStore] = None,
+                       **filters) -> AsyncGenerator[bytes, None]:
+    """One JSON line per session; each line carries the cursor to resume after it."""
+    async for session, transcript in iter_user_sessions(supabase, user_id, store=store, **filters):
+        yield (json.dumps(_session_record(session, transcript), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable sink: zipfile writes data descriptors and we drain the bytes as they come."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._buffer += data
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+async def stream_zip(
+    supabase: AsyncClient,
+    store: BlobStore,
+    user_id: str,
+    include_audio: bool = False,
+    progress: Optional[dict] = None,
+    **filters
+) -> AsyncGenerator[bytes, None]:
+    """
+    Zip archive streamed entry by entry: memory stays bounded by one session
+    (one audio file at most), whatever the archive size.
+    Each session lives in its own folder whose transcript.json carries the `cursor`
+    to resume after it (`after=<cursor>`).
+    `progress`, when given, is updated with the cursor and count of the sessions written.
+    """
+    import zipfile  # only exports need it
+
+    progress = progress if progress is not None else {}
+    progress.setdefault("count", 0)
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED)
+
+    async for session, transcript in iter_user_sessions(supabase, user_id, store=store, **filters):
+        folder = f"{session.get('started_at', '')}_{session['id']}".replace(":", "-")
+        segments = transcript.get("segments") or {}
+
+        archive.writestr(f"{folder}/transcript.json", json.dumps(_session_record(session, transcript), ensure_ascii=False))
+        if segments.get("start_ms"):
+            archive.writestr(f"{folder}/transcript.srt", "".join(iter_srt(segments)))
+            archive.writestr(f"{folder}/transcript.vtt", "".join(iter_vtt(segments)))
+        yield sink.drain()
+
+        if include_audio:
+            manifest = await store.read_manifest(session["id"])
+            audio_name = manifest.get("audio") or "merged.flac"
+            try:
+                audio = await store.download(f"{session['id']}/{audio_name}")
+            except Exception:
+                audio = None
+            if audio:
+                # already compressed, store as is
+                archive.writestr(zipfile.ZipInfo(f"{folder}/{audio_name}"), audio, compress_type=zipfile.ZIP_STORED)
+                yield sink.drain()
+
+        progress["cursor"], progress["count"] = session.get("started_at"), progress["count"] + 1
+
+    archive.close()
+    yield sink.drain()
+
+
+# --------------------------
+# BACKGROUND EXPORT JOBS
+# --------------------------
+
+def _job_key(job_id: str) -> str:
+    return f"export:{job_id}"
+
+
+def _lease_key(job_id: str) -> str:
+    return f"export:{job_id}:lease"
+
+
+async def export_job_running(redis_client: Redis, job_id: str) -> bool:
+    """A runner holds the job's lease (a `running` status alone may be left by a dead worker)."""
+    return bool(await redis_client.exists(_lease_key(job_id)))
+
+
+async def create_export_job(redis_client: Redis, user_id: str, include_audio: bool = False) -> dict:
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "status": "pending",
+        "include_audio": include_audio,
+        "cursor": None,
+        "parts": [],
+        "sessions": 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    await redis_client.set(_job_key(job["job_id"]), json.dumps(job), ex=EXPORT_JOB_TTL)
+    return job
+
+
+async def get_export_job(redis_client: Redis, job_id: str) -> dict:
+    data = await redis_client.get(_job_key(job_id))
+    return json.loads(data) if data else {}
+
+
+async def run_export_job(supabase: AsyncClient, store: BlobStore, redis_client: Redis, job_id: str) -> None:
+    """
+    Write the user's archive as numbered zip parts of EXPORT_JOB_PART_SIZE sessions.
+    Progress (cursor + finished parts) is saved after each part, so a failed or
+    interrupted job resumes from its last finished part instead of starting over.
+    """
+    # one runner per job: a resume while another runner is alive is a no-op
+    token = uuid.uuid4().hex
+    if not await redis_client.set(_lease_key(job_id), token, nx=True, ex=EXPORT_JOB_LEASE):
+        logging.info(f"Export job {job_id} is already running")
+        return
+    try:
+        await _run_export_job(supabase, store, redis_client, job_id)
+    finally:
+        if await redis_client.get(_lease_key(job_id)) in (token, token.encode()):
+            await redis_client.delete(_lease_key(job_id))
+
+
+async def _run_export_job(supabase: AsyncClient, store: BlobStore, redis_client: Redis, job_id: str) -> None:
+    job = await get_export_job(redis_client, job_id)
+    if not job or job["status"] == "completed":
+        return
+
+    job["status"] = "running"
+    await redis_client.set(_job_key(job_id), json.dumps(job), ex=EXPORT_JOB_TTL)
+    try:
+        while True:
+            part_path = f"exports/{job['user_id']}/{job_id}/part-{len(job['parts']) + 1:04d}.zip"
+            upload = store.create_multipart(part_path)
+            progress = {"cursor": job["cursor"], "count": 0}
+            renewed = time.monotonic()
+
+            async for data in stream_zip(supabase, store, job["user_id"], job["include_audio"], progress,
+                                         after=job["cursor"], limit=EXPORT_JOB_PART_SIZE):
+                if data:
+                    await upload.append(data)
+                if time.monotonic() - renewed > EXPORT_JOB_LEASE / 3:
+                    await redis_client.expire(_lease_key(job_id), EXPORT_JOB_LEASE)
+                    renewed = time.monotonic()
+
+            count = progress["count"]
+            if count == 0:
+                await upload.abort()
+                break
+
+            await redis_client.expire(_lease_key(job_id), EXPORT_JOB_LEASE)
+            await upload.complete(content_type="application/zip")
+            job["parts"].append(part_path)
+            job["cursor"], job["sessions"] = progress["cursor"], job["sessions"] + count
+            await redis_client.set(_job_key(job_id), json.dumps(job), ex=EXPORT_JOB_TTL)
+            if count < EXPORT_JOB_PART_SIZE:
+                break
+
+        job["status"] = "completed"
+    except Exception as e:
+        logging.error(f"Export job {job_id} failed: {e}")
+        job["status"], job["error"] = "failed", str(e)
+    await redis_client.set(_job_key(job_id), json.dumps(job), ex=EXPORT_JOB_TTL)
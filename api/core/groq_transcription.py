@@ -1,36 +1,86 @@
 import io
-import os
 import time
-from dotenv import load_dotenv
+from typing import List, Optional, Tuple
 from groq import AsyncGroq
+from api.core.config import get_settings
+from api.core.resilience import CircuitBreaker, UpstreamError, call_with_fallback
+from api.core.language import AUTO, normalize_language
 
-load_dotenv()
-api_key = os.getenv("GROQ_API_KEY")
+# Per-attempt deadline and total real-time budget for one chunk
+GROQ_TIMEOUT = get_settings().groq_timeout
+TRANSCRIPTION_BUDGET = get_settings().transcription_budget
 
-client = AsyncGroq(api_key=api_key)
+_client: Optional[AsyncGroq] = None
 
-async def transcript(
+
+def get_groq_client() -> AsyncGroq:
+    """Create the Groq client on first use instead of at import time."""
+    global _client
+    if _client is None:
+        # Retries are handled by the resilience layer, not by the SDK
+        _client = AsyncGroq(api_key=get_settings().groq_api_key, max_retries=0, timeout=GROQ_TIMEOUT)
+    return _client
+
+# Primary model first, fallback model second; one breaker each
+TRANSCRIPTION_ROUTES = [
+    ("whisper-large-v3-turbo", CircuitBreaker("groq:whisper-large-v3-turbo")),
+    ("whisper-large-v3", CircuitBreaker("groq:whisper-large-v3")),
+]
+
+
+def _segments(transcription) -> List[Tuple[float, float, str]]:
+    """Extract (start, end, text) segments from a verbose_json response (dicts or objects)."""
+    segments = []
+    for seg in getattr(transcription, "segments", None) or []:
+        get = seg.get if isinstance(seg, dict) else lambda k, seg=seg: getattr(seg, k, None)
+        text = (get("text") or "").strip()
+        if text:
+            segments.append((float(get("start") or 0.0), float(get("end") or 0.0), text))
+    return segments
+
+
+async def transcript_segments(
     audio_bytes: bytes,
-    source_language: str = "fr",
+    source_language: str | None = "fr",
     log: bool = False,
-    log_file: str = "transcription.log"
-) -> str:
+    log_file: str = "transcription.log",
+    budget: float = TRANSCRIPTION_BUDGET,
+    raise_on_error: bool = False,
+    prompt: str | None = None
+) -> dict:
     """
-    Transcribes an in-memory audio chunk (bytes) using Groq Whisper API.
+    Transcribes an in-memory audio chunk (bytes) using Groq Whisper API, with segment timestamps.
+    `prompt` carries the previous chunk's tail text so spelling and proper nouns stay consistent.
+    With `source_language` None (or "auto") Whisper detects the language.
+    Returns {"text", "segments": [(start_s, end_s, text)], "duration", "language"} relative to the chunk.
+    Retries within `budget` seconds and falls back to the next model when a circuit is open.
+    On failure returns an empty result unless `raise_on_error` is set, in which case UpstreamError is raised.
     """
     start_time = time.time()
 
     if not audio_bytes:
         raise ValueError("Audio bytes input is empty.")
+    forced = source_language if source_language and source_language != AUTO else None
 
-    try:
-        # Convert bytes into file-like object
-        flac_bytes = ("chunk.flac", io.BytesIO(audio_bytes))
+    def make_call(model: str):
+        async def call():
+            # Convert bytes into file-like object (fresh per attempt)
+            flac_bytes = ("chunk.flac", io.BytesIO(audio_bytes))
+            return await get_groq_client().audio.transcriptions.create(
+                file=flac_bytes,
+                model=model,
+                **({"language": forced} if forced else {}),
+                response_format="verbose_json",
+                timestamp_granularities=["segment"],
+                **({"prompt": prompt} if prompt else {}),
+            )
+        return call
 
-        transcription = await client.audio.transcriptions.create(
-            file=flac_bytes,
-            model="whisper-large-v3-turbo",
-            language=source_language,
+    try:
+        transcription = await call_with_fallback(
+            [(breaker, make_call(model)) for model, breaker in TRANSCRIPTION_ROUTES],
+            budget=budget,
+            timeout=GROQ_TIMEOUT,
         )
 
         elapsed = round(time.time() - start_time, 2)
@@ -42,13 +92,34 @@ async def transcript(
         else:
             print(message)
 
-        return transcription.text.strip()
+        segments = _segments(transcription)
+        duration = getattr(transcription, "duration", None) or (segments[-1][1] if segments else 0.0)
+        language = forced or normalize_language(getattr(transcription, "language", None))
+        return {"text": transcription.text.strip(), "segments": segments, "duration": float(duration), "language": language}
 
-    except Exception as e:
+    except UpstreamError as e:
         message = f"❌ Transcription failed: {e}"
         if log:
             with open(log_file, "a", encoding="utf-8") as f:
                 f.write(message + "\n")
         else:
             print(message)
-        return ""
+        if raise_on_error:
+            raise
+        return {"text": "", "segments": [], "duration": 0.0, "language": forced}
+
+
+async def transcript(
+    audio_bytes: bytes,
+    source_language: str = "fr",
+    log: bool = False,
+    log_file: str = "transcription.log",
+    budget: float = TRANSCRIPTION_BUDGET,
+    raise_on_error: bool = False
+) -> str:
+    """
+    Transcribes an in-memory audio chunk (bytes) using Groq Whisper API.
+    Plain-text variant of `transcript_segments`.
+    """
+    result = await transcript_segments(audio_bytes, source_language, log, log_file, budget, raise_on_error)
+    return result["text"]
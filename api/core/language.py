@@ -0,0 +1,93 @@
+import logging
+from collections import Counter
+from typing import List, Optional
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+AUTO = "auto"
+
+# Whisper reports the detected language by name in verbose_json
+WHISPER_LANGUAGES = {
+    "english": "en", "french": "fr", "spanish": "es", "german": "de", "italian": "it",
+    "portuguese": "pt", "dutch": "nl", "russian": "ru", "chinese": "zh", "japanese": "ja",
+    "korean": "ko", "arabic": "ar", "turkish": "tr", "polish": "pl", "ukrainian": "uk",
+    "swedish": "sv", "norwegian": "no", "danish": "da", "finnish": "fi", "greek": "el",
+    "czech": "cs", "romanian": "ro", "hungarian": "hu", "hebrew": "he", "hindi": "hi",
+    "vietnamese": "vi", "thai": "th", "indonesian": "id", "malay": "ms", "persian": "fa",
+    "catalan": "ca", "bulgarian": "bg", "croatian": "hr", "serbian": "sr", "slovak": "sk",
+    "slovenian": "sl", "lithuanian": "lt", "latvian": "lv", "estonian": "et", "tamil": "ta",
+    "urdu": "ur", "bengali": "bn", "swahili": "sw", "tagalog": "tl", "welsh": "cy",
+}
+
+
+def normalize_language(value: Optional[str]) -> Optional[str]:
+    """'French' / 'fr' / 'fr-FR' -> 'fr'; None when unknown."""
+    if not value:
+        return None
+    value = value.strip().lower()
+    if value in WHISPER_LANGUAGES:
+        return WHISPER_LANGUAGES[value]
+    code = value.split("-")[0]
+    return code if 2 <= len(code) <= 3 and code.isalpha() else None
+
+
+def same_language(a: str, b: str) -> bool:
+    return normalize_language(a) == normalize_language(b)
+
+
+class LanguageTracker:
+    """
+    Source language of a session.
+    With a fixed source, every chunk is transcribed and translated from it. In `auto` mode
+    Whisper detects the language of each chunk (it comes with the transcription, no extra call):
+    the first `detect_chunks` confident detections set the session language, which then
+    only changes after `drift_chunks` consecutive confident detections of another language.
+    Each chunk is routed with its own detected language when confident (bilingual speakers),
+    otherwise with the session language.
+    """
+
+    def __init__(self, source: str, fallback: str = "fr", detect_chunks: int = 2,
+                 drift_chunks: int = 2, min_chars: int = 20):
+        self.auto = source == AUTO
+        self.language: Optional[str] = None if self.auto else source
+        self.fallback = fallback
+        self.detect_chunks = detect_chunks
+        self.drift_chunks = drift_chunks
+        self.min_chars = min_chars
+        self._votes: List[str] = []
+        self._drift: List[str] = []
+
+    def request_language(self) -> Optional[str]:
+        """Language forced on Whisper; None lets it detect."""
+        return None if self.auto else self.language
+
+    def observe(self, detected: Optional[str], text: str) -> str:
+        """Record a chunk's detection and return the language to route that chunk with."""
+        if not self.auto:
+            return self.language
+
+        detected = normalize_language(detected)
+        confident = detected if detected and len(text.strip()) >= self.min_chars else None
+
+        if self.language is None:
+            if confident:
+                self._votes.append(confident)
+            if len(self._votes) >= self.detect_chunks:
+                self.language = Counter(self._votes).most_common(1)[0][0]
+                logging.info(f"🌐 Session language detected: {self.language}")
+            return confident or detected or self._leading() or self.fallback
+
+        if confident and confident != self.language:
+            self._drift.append(confident)
+            if len(self._drift) >= self.drift_chunks and len(set(self._drift)) == 1:
+                logging.info(f"🌐 Session language drifted: {self.language} -> {confident}")
+                self.language, self._drift = confident, []
+            elif len(set(self._drift)) > 1:
+                self._drift = [confident]
+        elif confident:
+            self._drift = []
+        return confident or self.language
+
+    def _leading(self) -> Optional[str]:
+        return Counter(self._votes).most_common(1)[0][0] if self._votes else None
@@ -0,0 +1,85 @@
+import re
+from difflib import SequenceMatcher
+from typing import List, Tuple
+
+# --------------------------
+# OVERLAP RECONCILIATION
+# --------------------------
+# Each chunk is transcribed with the tail of the previous chunk's audio prepended,
+# so words cut at the boundary are heard whole. The words of that overlap then appear
+# at the end of the previous text and at the start of the new one; the helpers below
+# find that duplicated run by token alignment and drop it from the new text.
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def _normalize(token: str) -> str:
+    return "".join(_WORD.findall(token.lower()))
+
+
+def prompt_tail(text: str, max_chars: int = 200) -> str:
+    """Last words of a transcript, cut on a word boundary, to use as Whisper prompt."""
+    if len(text) <= max_chars:
+        return text
+    tail = text[-max_chars:]
+    return tail.split(" ", 1)[1] if " " in tail else tail
+
+
+def overlap_cut(previous_text: str, new_text: str, window: int = 24, max_skip: int = 3) -> int:
+    """
+    Number of words at the start of `new_text` that repeat the end of `previous_text`.
+    The duplicated run must end within one word of the previous text's end and begin within
+    `max_skip` words of the new text's start (the overlap may open on a word fragment).
+    """
+    new_tokens = new_text.split()
+    if not previous_text or not new_tokens:
+        return 0
+
+    tail = [_normalize(t) for t in previous_text.split()[-window:]]
+    head = [_normalize(t) for t in new_tokens[:window + max_skip]]
+
+    best_cut = 0
+    matcher = SequenceMatcher(None, tail, head, autojunk=False)
+    for block in matcher.get_matching_blocks():
+        if block.size == 0:
+            continue
+        touches_end = block.a + block.size >= len(tail) - 1
+        near_start = block.b <= max_skip
+        # a single matching word is only trusted when it is long enough to be meaningful
+        long_enough = block.size >= 2 or len(tail[block.a]) >= 5
+        if touches_end and near_start and long_enough:
+            best_cut = max(best_cut, block.b + block.size)
+    return best_cut
+
+
+def dedupe_overlap(previous_text: str, new_text: str, window: int = 24, max_skip: int = 3) -> str:
+    """Remove from the start of `new_text` the words that repeat the end of `previous_text`."""
+    cut = overlap_cut(previous_text, new_text, window, max_skip)
+    return " ".join(new_text.split()[cut:]) if cut else new_text
+
+
+def trim_overlap_segments(segments: List[Tuple[float, float, str]], overlap_s: float,
+                          cut_words: int = 0) -> List[Tuple[float, float, str]]:
+    """
+    Drop the first `cut_words` words (the run found by `overlap_cut`) from the segments, removing
+    the segments left empty, and shift the rest back by the prepended overlap. The segment text
+    is cut like the chunk text, so a segment straddling the boundary loses its repeated words too.
+    """
+    trimmed = []
+    for start, end, text in segments:
+        if cut_words:
+            words = text.split()
+            dropped = min(cut_words, len(words))
+            cut_words -= dropped
+            if dropped == len(words):
+                continue
+            text = " ".join(words[dropped:])
+        if overlap_s > 0:
+            start, end = max(0.0, start - overlap_s), max(0.0, end - overlap_s)
+        trimmed.append((start, end, text))
+    return trimmed
+
+
+def segments_match_text(segments: List[Tuple[float, float, str]], text: str) -> bool:
+    """Whether the segments join (word for word) to the chunk text."""
+    return " ".join(segment[2] for segment in segments).split() == text.split()
@@ -0,0 +1,269 @@
+import os
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from api.core.config import get_settings
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+settings = get_settings()
+
+PROFILING_ENABLED = settings.profiling_enabled
+
+
+# --------------------------
+# EVENT LOOP LAG
+# --------------------------
+
+class LoopLagMonitor:
+    """
+    Sleeps `interval` seconds in a loop and measures how late it wakes up:
+    the overshoot is the time the event loop was busy with something else.
+    """
+
+    def __init__(self, interval: float, warn_ms: float):
+        self.interval = interval
+        self.warn_ms = warn_ms
+        self.last_ms = 0.0
+        self.max_ms = 0.0
+        self.avg_ms = 0.0
+        self.samples = 0
+        self.loop_thread: Optional[int] = None
+
+    async def run(self) -> None:
+        self.loop_thread = threading.get_ident()
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, (loop.time() - expected) * 1000)
+            self.last_ms, self.max_ms = lag, max(self.max_ms, lag)
+            self.avg_ms = lag if not self.samples else 0.9 * self.avg_ms + 0.1 * lag
+            self.samples += 1
+            if lag > self.warn_ms:
+                logging.warning(f"🐢 Event loop lag {lag:.0f} ms")
+
+    def stats(self) -> dict:
+        return {
+            "last_ms": round(self.last_ms, 2),
+            "avg_ms": round(self.avg_ms, 2),
+            "max_ms": round(self.max_ms, 2),
+            "samples": self.samples,
+        }
+
+
+loop_monitor = LoopLagMonitor(settings.loop_lag_interval, settings.loop_lag_warn_ms)
+
+
+# --------------------------
+# SAMPLING PROFILER
+# --------------------------
+
+def _stack(frame) -> str:
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def sample_stacks(thread_id: int, seconds: float, interval: float = 0.005) -> Dict[str, int]:
+    """
+    Sample the stack of one thread every `interval` seconds (run this in another thread).
+    Returns collapsed stacks (`outer;...;inner` -> samples), the flame graph input format.
+    """
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            counts[_stack(frame)] += 1
+        time.sleep(interval)
+    return dict(counts)
+
+
+async def profile_loop(seconds: float, interval: float = 0.005) -> Dict[str, int]:
+    """Sample the event loop thread for `seconds` without blocking it."""
+    thread_id = loop_monitor.loop_thread or threading.get_ident()
+    return await asyncio.to_thread(sample_stacks, thread_id, seconds, interval)
+
+
+# --------------------------
+# SPANS
+# --------------------------
+# OpenTelemetry-style spans (trace id, span id, parent, attributes) kept in memory
+# per chunk. A chunk slower than the threshold dumps its span tree to the log.
+
+_current: ContextVar[Optional[Tuple["ChunkTrace", "Span"]]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "span_id", "attributes", "start", "end", "children")
+
+    def __init__(self, name: str, attributes: dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.attributes = attributes
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+
+
+class ChunkTrace:
+    """
+    Span tree of one chunk through the pipeline. Stages open spans from different tasks
+    (receive, transcription, translation, send, persistence); the chunk is finished once
+    it is sealed and every span is closed.
+    """
+
+    def __init__(self, session_id: str, seq: int, threshold_ms: float, on_finish=None):
+        self.trace_id = os.urandom(16).hex()
+        self.root = Span("chunk", {"session_id": session_id, "chunk": seq})
+        self.threshold_ms = threshold_ms
+        self._open = 0
+        self._sealed = False
+        self._on_finish = on_finish
+
+    def start(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        span = Span(name, attributes)
+        (parent or self.root).children.append(span)
+        self._open += 1
+        return span
+
+    def end(self, span: Span) -> None:
+        span.end = time.monotonic()
+        self._open -= 1
+        self._maybe_finish()
+
+    def record(self, name: str, start: float, end: float, **attributes) -> None:
+        """Add an already finished span (e.g. a receive measured before the chunk was accepted)."""
+        span = Span(name, attributes)
+        span.start, span.end = start, end
+        self.root.start = min(self.root.start, start)
+        self.root.children.append(span)
+
+    @contextmanager
+    def span(self, name: str, parent: Optional[Span] = None, **attributes):
+        span = self.start(name, parent, **attributes)
+        token = _current.set((self, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes["error"] = repr(e)
+            raise
+        finally:
+            _current.reset(token)
+            self.end(span)
+
+    def seal(self) -> None:
+        """No more stages will start spans for this chunk."""
+        self._sealed = True
+        self._maybe_finish()
+
+    def _maybe_finish(self) -> None:
+        if not self._sealed or self._open or self.root.end is not None:
+            return
+        self.root.end = max([self.root.start] + [c.end for c in self.root.children if c.end])
+        if self._on_finish:
+            self._on_finish(self)
+        # latency counts from the end of the receive, waiting for the client is not ours
+        received = next((c.end for c in self.root.children if c.name == "receive_bytes"), self.root.start)
+        latency_ms = (self.root.end - received) * 1000
+        if latency_ms > self.threshold_ms:
+            logging.warning(f"🐌 Slow chunk ({latency_ms:.0f} ms > {self.threshold_ms:.0f} ms)\n{self.format()}")
+
+    def format(self) -> str:
+        lines = [f"trace {self.trace_id}"]
+
+        def walk(span: Span, depth: int):
+            offset = (span.start - self.root.start) * 1000
+            duration = ((span.end or time.monotonic()) - span.start) * 1000
+            attrs = " ".join(f"{k}={v}" for k, v in span.attributes.items())
+            lines.append(f"{'  ' * depth}{span.name} [{span.span_id}] +{offset:.1f}ms {duration:.1f}ms {attrs}".rstrip())
+            for child in sorted(span.children, key=lambda c: c.start):
+                walk(child, depth + 1)
+
+        walk(self.root, 0)
+        return "\n".join(lines)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Child span of the current one (same task or inherited context); no-op outside a chunk trace."""
+    current = _current.get()
+    if current is None:
+        yield None
+        return
+    trace, parent = current
+    with trace.span(name, parent=parent, **attributes) as child:
+        yield child
+
+
+class _NullChunk:
+    def span(self, name: str, parent=None, **attributes):
+        return nullcontext()
+
+    def start(self, name: str, parent=None, **attributes):
+        return None
+
+    def end(self, span) -> None:
+        pass
+
+    def record(self, name: str, start: float, end: float, **attributes) -> None:
+        pass
+
+    def seal(self) -> None:
+        pass
+
+
+_NULL_CHUNK = _NullChunk()
+
+
+class SessionTracer:
+    """Chunk traces of one session, addressed by the chunk's position in the pipeline."""
+
+    def __init__(self, session_id: str, threshold_ms: float = settings.slow_chunk_ms, enabled: bool = True):
+        self.session_id = session_id
+        self.threshold_ms = threshold_ms
+        self.enabled = enabled
+        self.chunks: Dict[int, ChunkTrace] = {}
+
+    def chunk(self, seq: int):
+        if not self.enabled:
+            return _NULL_CHUNK
+        trace = self.chunks.get(seq)
+        if trace is None:
+            trace = ChunkTrace(self.session_id, seq, self.threshold_ms, lambda t: self.chunks.pop(seq, None))
+            self.chunks[seq] = trace
+        return trace
+
+
+NULL_TRACER = SessionTracer("", enabled=False)
+
+
+def session_tracer(session_id: str) -> SessionTracer:
+    return SessionTracer(session_id) if PROFILING_ENABLED else NULL_TRACER
+
+
+def traced_task(trace, name: str, coro, **attributes) -> asyncio.Task:
+    """
+    Run `coro` as a background task inside a span of `trace`. The span is opened right away,
+    so the chunk is not considered finished before the task has even started.
+    """
+    span = trace.start(name, **attributes)
+
+    async def run():
+        try:
+            return await coro
+        finally:
+            trace.end(span)
+
+    return asyncio.create_task(run())
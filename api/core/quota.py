@@ -0,0 +1,216 @@
+import time
+import uuid
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from redis.asyncio import Redis
+from api.core.config import get_settings
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+settings = get_settings()
+
+SOCKET_LEASE_SECONDS = 120   # a socket lease not refreshed for this long is considered dead
+USAGE_TTL = 100 * 86400      # usage counters outlive their month for reporting
+
+
+def current_period(now: Optional[datetime] = None) -> str:
+    """Quota accounting period (calendar month, UTC)."""
+    return (now or datetime.now(timezone.utc)).strftime("%Y-%m")
+
+
+def _usage_key(user_id: str, period: str) -> str:
+    return f"usage:{user_id}:{period}"
+
+
+def _users_key(period: str) -> str:
+    return f"usage:users:{period}"
+
+
+def _sockets_key(user_id: str) -> str:
+    return f"sockets:{user_id}"
+
+
+def _rate_key(user_id: str) -> str:
+    return f"ratelimit:{user_id}"
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+# --------------------------
+# SLIDING WINDOW RATE LIMIT
+# --------------------------
+
+async def hit_rate_limit(redis_client: Redis, user_id: str, limit: int, window: float = 60.0) -> Tuple[bool, float]:
+    """
+    Count one event in the user's sliding window (sorted set of timestamps).
+    Returns (allowed, retry_after seconds). Rejected events are not counted.
+    """
+    key = _rate_key(user_id)
+    now = time.time()
+    member = f"{now}:{uuid.uuid4().hex[:8]}"
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zremrangebyscore(key, 0, now - window)
+        pipe.zadd(key, {member: now})
+        pipe.zcard(key)
+        pipe.zrange(key, 0, 0, withscores=True)
+        pipe.expire(key, int(window) + 1)
+        _, _, count, oldest, _ = await pipe.execute()
+
+    if count <= limit:
+        return True, 0.0
+
+    await redis_client.zrem(key, member)
+    retry_after = window - (now - oldest[0][1]) if oldest else window
+    return False, round(max(retry_after, 0.0), 2)
+
+
+# --------------------------
+# CONCURRENT SOCKETS
+# --------------------------
+
+async def acquire_socket(redis_client: Redis, user_id: str, max_sockets: int) -> Optional[str]:
+    """
+    Admit a new socket for the user if under the concurrency limit.
+    Returns a lease id to release on disconnect, or None when the limit is reached.
+    Leases of crashed workers expire after SOCKET_LEASE_SECONDS.
+    """
+    key = _sockets_key(user_id)
+    lease = uuid.uuid4().hex
+    now = time.time()
+
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zremrangebyscore(key, 0, now - SOCKET_LEASE_SECONDS)
+        pipe.zadd(key, {lease: now})
+        pipe.zcard(key)
+        pipe.expire(key, SOCKET_LEASE_SECONDS)
+        _, _, count, _ = await pipe.execute()
+
+    if count > max_sockets:
+        await redis_client.zrem(key, lease)
+        return None
+    return lease
+
+
+async def release_socket(redis_client: Redis, user_id: str, lease: str) -> None:
+    await redis_client.zrem(_sockets_key(user_id), lease)
+
+
+# --------------------------
+# QUOTA LEDGER
+# --------------------------
+
+async def get_usage(redis_client: Redis, user_id: str, period: Optional[str] = None) -> dict:
+    """Consumption of a user for a period: audio_ms, chunks, sessions."""
+    raw = await redis_client.hgetall(_usage_key(user_id, period or current_period()))
+    return {_decode(k): int(v) for k, v in raw.items()}
+
+
+async def list_usage(redis_client: Redis, period: Optional[str] = None, limit: int = 100, offset: int = 0) -> List[dict]:
+    """Consumption of every user active in a period, highest audio time first."""
+    period = period or current_period()
+    users = await redis_client.zrevrange(_users_key(period), offset, offset + limit - 1, withscores=True)
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for user_id, _ in users:
+            pipe.hgetall(_usage_key(_decode(user_id), period))
+        rows = await pipe.execute()
+
+    return [
+        {"user_id": _decode(user_id), **{_decode(k): int(v) for k, v in row.items()}}
+        for (user_id, _), row in zip(users, rows)
+    ]
+
+
+class UsageLedger:
+    """
+    Per-socket usage accounting.
+    Increments are kept locally and written to Redis in one pipeline every `flush_every`
+    seconds (and at close), so chunks do not each cost a round-trip.
+    Quota checks use the stored total read at admission plus the local increments.
+    The socket lease, when given, is refreshed with the same pipeline.
+    """
+
+    def __init__(self, redis_client: Redis, user_id: str, quota_ms: Optional[int], flush_every: float,
+                 lease: Optional[str] = None):
+        self.redis_client = redis_client
+        self.user_id = user_id
+        self.lease = lease
+        self.quota_ms = quota_ms
+        self.flush_every = flush_every
+        self.period = current_period()
+        self.stored_ms = 0
+        self.pending: Dict[str, int] = {}
+        self._last_flush = time.monotonic()
+
+    async def load(self) -> None:
+        self.stored_ms = (await get_usage(self.redis_client, self.user_id, self.period)).get("audio_ms", 0)
+
+    @property
+    def used_ms(self) -> int:
+        return self.stored_ms + self.pending.get("audio_ms", 0)
+
+    @property
+    def exhausted(self) -> bool:
+        return self.quota_ms is not None and self.used_ms >= self.quota_ms
+
+    @property
+    def remaining_ms(self) -> Optional[int]:
+        return None if self.quota_ms is None else max(self.quota_ms - self.used_ms, 0)
+
+    async def record(self, **increments: int) -> None:
+        for field, amount in increments.items():
+            self.pending[field] = self.pending.get(field, 0) + amount
+        if time.monotonic() - self._last_flush >= self.flush_every:
+            await self.flush()
+
+    async def flush(self) -> None:
+        self._last_flush = time.monotonic()
+        if not self.pending and not self.lease:
+            return
+        pending, self.pending = self.pending, {}
+        key = _usage_key(self.user_id, self.period)
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for field, amount in pending.items():
+                    pipe.hincrby(key, field, amount)
+                if pending:
+                    pipe.expire(key, USAGE_TTL)
+                    pipe.zincrby(_users_key(self.period), pending.get("audio_ms", 0), self.user_id)
+                    pipe.expire(_users_key(self.period), USAGE_TTL)
+                if self.lease:
+                    pipe.zadd(_sockets_key(self.user_id), {self.lease: time.time()})
+                    pipe.expire(_sockets_key(self.user_id), SOCKET_LEASE_SECONDS)
+                results = await pipe.execute()
+        except Exception as e:
+            # keep the increments for the next flush rather than losing them
+            for field, amount in pending.items():
+                self.pending[field] = self.pending.get(field, 0) + amount
+            logging.error(f"Usage flush failed for user {self.user_id}: {e}")
+            return
+        if "audio_ms" in pending:
+            self.stored_ms = int(results[list(pending).index("audio_ms")])
+
+    async def keepalive(self) -> None:
+        """Flush on a timer for the socket's lifetime, so an idle socket keeps its lease."""
+        interval = min(self.flush_every, SOCKET_LEASE_SECONDS / 3)
+        while True:
+            await asyncio.sleep(interval)
+            if time.monotonic() - self._last_flush >= interval:
+                await self.flush()
+
+
+def quota_ms() -> Optional[int]:
+    """Monthly audio quota per user in ms (None: unlimited)."""
+    minutes = settings.monthly_quota_minutes
+    return None if minutes is None else int(minutes * 60_000)
+
+
+def is_admin(user_id: str) -> bool:
+    admins = {u.strip() for u in (settings.admin_user_ids or "").split(",") if u.strip()}
+    return user_id in admins
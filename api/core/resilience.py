@@ -0,0 +1,182 @@
+import time
+import random
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Tuple, TypeVar
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+T = TypeVar("T")
+
+
+class UpstreamError(Exception):
+    """Raised when an upstream call could not complete within its budget."""
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised when the circuit breaker of an upstream refuses the call."""
+
+
+class UpstreamRejected(UpstreamError):
+    """Raised when an upstream refused the request itself (4xx): retrying would not help."""
+
+
+# errors worth retrying that carry no status code (Groq, deep_translator)
+TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "RequestError", "TooManyRequests", "ServerException"}
+
+
+def is_transient(error: BaseException) -> bool:
+    """Timeouts, connection errors, 429 and 5xx are transient; client errors (other 4xx, bad input) are not."""
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError, ConnectionError, OSError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return any(cls.__name__ in TRANSIENT_ERRORS for cls in type(error).__mro__)
+
+
+# --------------------------
+# CIRCUIT BREAKER
+# --------------------------
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+    After `failure_threshold` consecutive failures the circuit opens for `reset_timeout`
+    seconds, then lets a single probe call through.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        if self.opened_at is not None:
+            logging.info(f"✅ Circuit '{self.name}' closed again.")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                logging.warning(f"⚠️ Circuit '{self.name}' opened after {self.failures} failures.")
+            self.opened_at = time.monotonic()
+        self._probing = False
+
+    def release_probe(self) -> None:
+        """Give the half-open probe back when the call ended with neither outcome (e.g. cancelled)."""
+        self._probing = False
+
+
+# --------------------------
+# RETRIES WITH DEADLINE
+# --------------------------
+
+async def call_with_retry(
+    fn: Callable[[], Awaitable[T]],
+    breaker: CircuitBreaker,
+    budget: float,
+    timeout: float,
+    base_delay: float = 0.2,
+    max_delay: float = 2.0,
+) -> T:
+    """
+    Call `fn` until it succeeds or `budget` seconds have elapsed.
+    Each attempt is bounded by `timeout` (and by what remains of the budget),
+    and attempts are separated by full-jitter exponential backoff.
+    Only transient errors are retried and counted by the breaker: a client error
+    (e.g. a corrupt chunk) raises UpstreamRejected at once, so one bad request
+    cannot open the circuit shared by every user.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    attempt = 0
+    last_error: Exception | None = None
+
+    while True:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit '{breaker.name}' is open") from last_error
+
+        recorded = False
+        try:
+            result = await asyncio.wait_for(fn(), timeout=min(timeout, remaining))
+            breaker.record_success()
+            recorded = True
+            return result
+        except Exception as e:
+            if not is_transient(e):
+                raise UpstreamRejected(f"{breaker.name} rejected the request: {e!r}") from e
+            breaker.record_failure()
+            recorded = True
+            last_error = e
+            logging.warning(f"⚠️ {breaker.name} attempt {attempt + 1} failed: {e!r}")
+        finally:
+            # a cancelled probe must not keep the circuit half-open forever
+            if not recorded:
+                breaker.release_probe()
+
+        delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+        if loop.time() + delay >= deadline:
+            break
+        await asyncio.sleep(delay)
+        attempt += 1
+
+    raise UpstreamError(f"{breaker.name} failed within {budget}s budget") from last_error
+
+
+async def call_with_fallback(
+    routes: List[Tuple[CircuitBreaker, Callable[[], Awaitable[T]]]],
+    budget: float,
+    timeout: float,
+) -> T:
+    """
+    Try each (breaker, call) route in order, skipping routes whose circuit is open.
+    The budget is split across the routes still available so a slow primary
+    leaves time for the fallback, and the whole call stays within its deadline.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    last_error: Exception | None = None
+    available = [(breaker, fn) for breaker, fn in routes if breaker.state != "open"]
+
+    for position, (breaker, fn) in enumerate(available):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        share = remaining / (len(available) - position)
+        try:
+            return await call_with_retry(fn, breaker, share, timeout)
+        except UpstreamRejected:
+            raise
+        except UpstreamError as e:
+            last_error = e
+
+    raise UpstreamError("All upstream routes failed") from last_error
@@ -0,0 +1,155 @@
+import gzip
+import json
+import uuid
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from supabase import AsyncClient
+from api.core.blob_store import BlobStore
+from api.core.config import get_settings
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+# --------------------------
+# TIERED TRANSCRIPT RETENTION
+# --------------------------
+#   hot  : Redis, TTL refreshed on every read (api/core/cache.py)
+#   warm : the final row (chunk_index = -1) of the `transcripts` table
+#   cold : sessions ended more than COLD_AFTER_DAYS ago are moved into compressed archive
+#          objects `archive/transcripts/{user_id}/{batch}.jsonl.gz`, one gzip member per
+#          session. The index lives on the session row: sessions.archive = {path, offset, length},
+#          so a read decompresses only its own member.
+
+ARCHIVE_PREFIX = "archive/transcripts"
+RETENTION_LOCK = "retention:lock"
+
+
+def _pack(rows: List[dict]) -> tuple[bytes, Dict[str, dict]]:
+    """Concatenate one gzip member per transcript row; returns (object, {session_id: (offset, length)})."""
+    blob, index = bytearray(), {}
+    for row in rows:
+        member = gzip.compress(json.dumps(row, ensure_ascii=False, default=str).encode("utf-8"), compresslevel=9)
+        index[row["session_id"]] = {"offset": len(blob), "length": len(member)}
+        blob += member
+    return bytes(blob), index
+
+
+def unpack(blob: bytes, offset: int, length: int) -> dict:
+    return json.loads(gzip.decompress(blob[offset:offset + length]))
+
+
+async def archive_cold_transcripts(supabase: AsyncClient, store: BlobStore, older_than_days: float,
+                                   batch_size: int = 200) -> int:
+    """
+    Move the final transcripts of sessions ended before the threshold to the cold tier.
+    Order keeps every step recoverable: upload the archive, point the sessions at it,
+    then delete the table rows.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    sessions = await supabase.table("sessions").select("id, user_id") \
+        .lt("ended_at", cutoff.isoformat()) \
+        .is_("archive", "null") \
+        .order("ended_at").limit(batch_size).execute()
+    if not sessions.data:
+        return 0
+
+    owners = {s["id"]: s["user_id"] for s in sessions.data}
+    rows = await supabase.table("transcripts").select("*") \
+        .in_("session_id", list(owners)).eq("chunk_index", -1).execute()
+
+    by_user: Dict[str, List[dict]] = defaultdict(list)
+    for row in rows.data or []:
+        by_user[owners[row["session_id"]]].append(row)
+
+    archived = []
+    for user_id, user_rows in by_user.items():
+        blob, index = _pack(user_rows)
+        path = f"{ARCHIVE_PREFIX}/{user_id}/{datetime.now(timezone.utc):%Y%m%d}-{uuid.uuid4().hex[:8]}.jsonl.gz"
+        await store.upload(path, blob, content_type="application/gzip")
+        for session_id, location in index.items():
+            await supabase.table("sessions").update({"archive": {"path": path, **location}}) \
+                .eq("id", session_id).execute()
+            archived.append(session_id)
+
+    # sessions without a final transcript are marked too, so they are not scanned again
+    for session_id in set(owners) - set(archived):
+        await supabase.table("sessions").update({"archive": {"path": None}}).eq("id", session_id).execute()
+
+    if archived:
+        await supabase.table("transcripts").delete().in_("session_id", archived).execute()
+        logging.info(f"🧊 Archived {len(archived)} transcripts to cold storage")
+    return len(archived)
+
+
+async def read_archived_transcript(store: BlobStore, archive: Optional[dict]) -> dict:
+    """Cold tier read: the session's gzip member inside its archive object."""
+    if not archive or not archive.get("path"):
+        return {}
+    blob = await store.download(archive["path"])
+    if not blob:
+        return {}
+    return await asyncio.to_thread(unpack, blob, archive["offset"], archive["length"])
+
+
+async def load_final_transcripts(supabase: AsyncClient, store: BlobStore, sessions: List[dict]) -> Dict[str, dict]:
+    """
+    Final transcripts of several sessions (rows of the `sessions` table): warm tier in one
+    query, then the archived ones, downloading each archive object once.
+    """
+    if not sessions:
+        return {}
+    response = await supabase.table("transcripts").select("*") \
+        .in_("session_id", [s["id"] for s in sessions]).eq("chunk_index", -1).execute()
+    found = {t["session_id"]: t for t in response.data or []}
+
+    cold = defaultdict(list)
+    for s in sessions:
+        archive = s.get("archive") or {}
+        if s["id"] not in found and archive.get("path"):
+            cold[archive["path"]].append((s["id"], archive))
+
+    for path, members in cold.items():
+        blob = await store.download(path)
+        if not blob:
+            continue
+        for session_id, archive in members:
+            found[session_id] = await asyncio.to_thread(unpack, blob, archive["offset"], archive["length"])
+    return found
+
+
+async def get_final_transcript(supabase: AsyncClient, store: BlobStore, session_id: str) -> dict:
+    """Warm then cold tier read of one session's final transcript."""
+    response = await supabase.table("transcripts").select("*") \
+        .eq("session_id", session_id).eq("chunk_index", -1).execute()
+    if response.data:
+        return response.data[0]
+    session = await supabase.table("sessions").select("archive").eq("id", session_id).execute()
+    if not session.data:
+        return {}
+    return await read_archived_transcript(store, session.data[0].get("archive"))
+
+
+async def retention_loop(app) -> None:
+    """
+    Background job: move the transcripts past the warm window to the cold tier.
+    Every worker runs the loop; a Redis lock lets a single one archive per interval.
+    """
+    settings = get_settings()
+    redis_client = app.state.redis_client
+    while True:
+        token = uuid.uuid4().hex
+        try:
+            if await redis_client.set(RETENTION_LOCK, token, nx=True, ex=settings.retention_interval):
+                try:
+                    while await archive_cold_transcripts(app.state.supabase, app.state.blob_store,
+                                                         settings.cold_after_days, settings.archive_batch_size):
+                        pass
+                finally:
+                    if await redis_client.get(RETENTION_LOCK) in (token, token.encode()):
+                        await redis_client.delete(RETENTION_LOCK)
+        except Exception as e:
+            logging.error(f"Transcript archival failed: {e}")
+        await asyncio.sleep(settings.retention_interval)
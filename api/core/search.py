@@ -0,0 +1,207 @@
+import re
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from typing import List, Optional
+from supabase import AsyncClient
+from api.core.blob_store import BlobStore
+from api.core.retention import load_final_transcripts
+from api.core.config import get_settings
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+SEARCH_INDEX_PATH = get_settings().search_index_path
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+# column positions in the FTS table, used by snippet()
+_COLUMNS = {"original": 3, "translated": 4}
+
+
+def build_match_query(query: str, phrase: bool = False) -> str:
+    """
+    Turn free user input into a safe FTS5 MATCH expression.
+    Tokens are quoted (no operator injection) and the last one is prefix-matched.
+    """
+    tokens = re.findall(r"\w+", query.lower())
+    if not tokens:
+        return ""
+    if phrase:
+        return '"' + " ".join(tokens) + '"'
+    return " ".join(f'"{t}"' for t in tokens[:-1]) + f' "{tokens[-1]}"*'
+
+
+class TranscriptSearchIndex:
+    """
+    Inverted index over final session transcripts (SQLite FTS5).
+    Rows are added incrementally when a session is finalized; queries are ranked with bm25
+    and filtered per user.
+    The index is a file local to the host: the workers of one host share it (SQLite serializes
+    writers), but sessions finalized on another host only show up after `rebuild_search_index`.
+    Run the API on a single host, or rebuild from the admin endpoint after scaling out.
+    """
+
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def open(self) -> None:
+        if self._conn is not None:
+            return
+        # other workers of the host may hold the write lock
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS transcripts_fts USING fts5(
+                session_id UNINDEXED,
+                user_id UNINDEXED,
+                created_at UNINDEXED,
+                original_text,
+                translated_text,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        conn.commit()
+        self._conn = conn
+        logging.info(f"✅ Search index opened at {self.path}")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ---- blocking implementations (run in a thread) ----
+
+    def _add(self, session_id: str, user_id: str, created_at: str, original_text: str, translated_text: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM transcripts_fts WHERE session_id = ?", (session_id,))
+            self._conn.execute(
+                "INSERT INTO transcripts_fts (session_id, user_id, created_at, original_text, translated_text) VALUES (?, ?, ?, ?, ?)",
+                (session_id, user_id, created_at, original_text, translated_text),
+            )
+            self._conn.commit()
+
+    def _add_many(self, rows: List[tuple]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM transcripts_fts WHERE session_id = ?", [(row[0],) for row in rows])
+            self._conn.executemany(
+                "INSERT INTO transcripts_fts (session_id, user_id, created_at, original_text, translated_text) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def _count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM transcripts_fts").fetchone()[0]
+
+    def _remove(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM transcripts_fts WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def _search(self, user_id: str, match: str, field: str, limit: int, offset: int) -> List[dict]:
+        target = "transcripts_fts" if field == "both" else f"{field}_text"
+        sql = f"""
+            SELECT session_id, created_at,
+                   snippet(transcripts_fts, {_COLUMNS['original']}, ?, ?, '…', 16),
+                   snippet(transcripts_fts, {_COLUMNS['translated']}, ?, ?, '…', 16),
+                   bm25(transcripts_fts) AS score
+            FROM transcripts_fts
+            WHERE {target} MATCH ? AND user_id = ?
+            ORDER BY score
+            LIMIT ? OFFSET ?
+        """
+        params = (HIGHLIGHT_START, HIGHLIGHT_END, HIGHLIGHT_START, HIGHLIGHT_END, match, user_id, limit, offset)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "session_id": session_id,
+                "created_at": created_at,
+                "original_snippet": original,
+                "translated_snippet": translated,
+                "score": round(-score, 4),
+            }
+            for session_id, created_at, original, translated, score in rows
+        ]
+
+    # ---- async API ----
+
+    async def add(self, session_id: str, user_id: str, created_at: str, original_text: str, translated_text: str) -> None:
+        if self._conn is None:
+            self.open()
+        await asyncio.to_thread(self._add, session_id, user_id, str(created_at), original_text, translated_text)
+
+    async def add_many(self, rows: List[tuple]) -> None:
+        """Upsert (session_id, user_id, created_at, original_text, translated_text) rows in one transaction."""
+        if self._conn is None:
+            self.open()
+        if rows:
+            await asyncio.to_thread(self._add_many, rows)
+
+    async def count(self) -> int:
+        if self._conn is None:
+            self.open()
+        return await asyncio.to_thread(self._count)
+
+    async def remove(self, session_id: str) -> None:
+        if self._conn is None:
+            self.open()
+        await asyncio.to_thread(self._remove, session_id)
+
+    async def search(self, user_id: str, query: str, field: str = "both", phrase: bool = False,
+                     limit: int = 20, offset: int = 0) -> dict:
+        if field not in ("both", "original", "translated"):
+            raise ValueError(f"Unknown search field: {field}")
+        if self._conn is None:
+            self.open()
+
+        start = time.perf_counter()
+        match = build_match_query(query, phrase)
+        results = await asyncio.to_thread(self._search, user_id, match, field, limit, offset) if match else []
+        return {
+            "query": query,
+            "results": results,
+            "took_ms": round((time.perf_counter() - start) * 1000, 2),
+        }
+
+
+search_index = TranscriptSearchIndex()
+
+
+async def rebuild_search_index(supabase: AsyncClient, store: BlobStore, index: TranscriptSearchIndex = search_index,
+                               batch_size: int = 200) -> int:
+    """
+    Backfill the index from the final transcripts (warm rows and cold archives), one page of
+    sessions at a time. Rows are upserted, so it can run while sessions are being finalized.
+    Returns the number of sessions indexed.
+    """
+    indexed, last_id = 0, None
+    while True:
+        query = supabase.table("sessions").select("id, user_id, archive").order("id").limit(batch_size)
+        if last_id:
+            query = query.gt("id", last_id)
+        sessions = (await query.execute()).data or []
+        if not sessions:
+            break
+
+        finals = await load_final_transcripts(supabase, store, sessions)
+        rows = [
+            (s["id"], s["user_id"], str(final.get("created_at")),
+             final.get("original_text") or "", final.get("translated_text") or "")
+            for s in sessions if (final := finals.get(s["id"]))
+        ]
+        await index.add_many(rows)
+        indexed += len(rows)
+        last_id = sessions[-1]["id"]
+        if len(sessions) < batch_size:
+            break
+
+    logging.info(f"🔎 Search index rebuilt ({indexed} sessions)")
+    return indexed
@@ -0,0 +1,88 @@
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+# --------------------------
+# TIME-ALIGNED TRANSCRIPT SEGMENTS
+# --------------------------
+# Segments are stored column-wise to stay compact in JSON and to allow
+# binary search on the (sorted) start times:
+#
+#   {"start_ms": [...], "end_ms": [...], "chunk": [...], "text": [...],
+#    "chunks": {"index": [...], "start_ms": [...], "end_ms": [...], "translated": [...], "language": [...]}}
+#
+# Once diarized, "speaker" holds one label per segment and "speakers" the speaker turns.
+#
+# All times are milliseconds from the start of the session audio.
+
+
+def empty_columns() -> dict:
+    return {
+        "start_ms": [], "end_ms": [], "chunk": [], "text": [],
+        "chunks": {"index": [], "start_ms": [], "end_ms": [], "translated": [], "language": []},
+    }
+
+
+def pack_chunk_segments(segments: List[Tuple[float, float, str]], offset_ms: int, chunk_index: int) -> dict:
+    """Offset chunk-relative (start_s, end_s, text) segments by the chunk position in the session."""
+    return {
+        "start_ms": [offset_ms + int(start * 1000) for start, _, _ in segments],
+        "end_ms": [offset_ms + int(end * 1000) for _, end, _ in segments],
+        "chunk": [chunk_index] * len(segments),
+        "text": [text for _, _, text in segments],
+    }
+
+
+def merge_chunk_rows(rows: List[dict]) -> dict:
+    """
+    Concatenate the packed segments of the chunk rows of a session (ordered by chunk_index)
+    into one session-level columnar structure.
+    """
+    columns = empty_columns()
+    for row in rows:
+        packed = row.get("segments") or {}
+        for key in ("start_ms", "end_ms", "chunk", "text"):
+            columns[key].extend(packed.get(key, []))
+
+        offset_ms = row.get("offset_ms") or 0
+        columns["chunks"]["index"].append(row.get("chunk_index"))
+        columns["chunks"]["start_ms"].append(offset_ms)
+        columns["chunks"]["end_ms"].append(offset_ms + (row.get("duration_ms") or 0))
+        columns["chunks"]["translated"].append(row.get("translated_text", ""))
+        columns["chunks"]["language"].append(row.get("language"))
+    return columns
+
+
+def slice_segments(columns: dict, start_ms: int, end_ms: int) -> dict:
+    """Return the segments overlapping [start_ms, end_ms) and the translations of their chunks."""
+    starts, ends = columns.get("start_ms", []), columns.get("end_ms", [])
+    speakers = columns.get("speaker")
+
+    # segments are sorted by start; the first overlapping one may start before start_ms
+    lo = bisect_left(starts, start_ms)
+    while lo > 0 and ends[lo - 1] > start_ms:
+        lo -= 1
+    hi = bisect_right(starts, end_ms - 1) if end_ms > start_ms else lo
+
+    segments = [
+        {
+            "start_ms": starts[i],
+            "end_ms": ends[i],
+            "chunk": columns["chunk"][i],
+            "text": columns["text"][i],
+            **({"speaker": speakers[i]} if speakers else {}),
+        }
+        for i in range(lo, hi)
+    ]
+
+    chunks = columns.get("chunks", {})
+    position = {c: i for i, c in enumerate(chunks.get("index", []))}
+    translations = [
+        {
+            "chunk": c,
+            "start_ms": chunks["start_ms"][position[c]],
+            "end_ms": chunks["end_ms"][position[c]],
+            "translated_text": chunks["translated"][position[c]],
+        }
+        for c in sorted({s["chunk"] for s in segments}) if c in position
+    ]
+    return {"segments": segments, "translations": translations}
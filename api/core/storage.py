@@ -1,12 +1,9 @@
-import os
 from datetime import datetime
 from supabase import acreate_client, AsyncClient
-from dotenv import load_dotenv
+from api.core.config import get_settings
 import logging
 
-# getting the env variables
-load_dotenv()
-SUPABASE_BUCKET = os.getenv('SUPABASE_BUCKET','echonote_bucket')
+SUPABASE_BUCKET = get_settings().supabase_bucket
 
 # Optional logging setup
 logging.basicConfig(level=logging.INFO)
@@ -47,40 +44,46 @@ async def start_session(
 
 async def start_transcript(
     supabase:AsyncClient,
-    audio_bytes: bytes,
     transcript_id: str,
     session_id: str,
     chunk_index: int,
     start_time: datetime,
     original_text: str,
     translated_text: str,
+    offset_ms: int = 0,
+    duration_ms: int = 0,
+    segments: dict | None = None,
+    translations: dict | None = None,
+    language: str | None = None,
     log: bool = False
 ) -> None:
-    """Insert transcript metadata and upload audio chunk to Supabase Storage."""
+    """
+    Upsert transcript metadata on (session_id, chunk_index), so a replayed chunk never
+    creates a second row. Chunk audio is appended to the session audio object separately.
+    `offset_ms` is the chunk position on the session audio timeline and `segments`
+    its packed, session-relative segment timestamps. `translations` holds every target language
+    and `language` the source language the chunk was transcribed and translated from.
+    """
     try:
         start_iso = start_time.isoformat()
-        # Insert transcript metadata
-        db_response = await supabase.table("transcripts").insert({
+        # Upsert transcript metadata
+        db_response = await supabase.table("transcripts").upsert({
             "transcript_id": transcript_id,
             "session_id": session_id,
             "chunk_index": chunk_index,
             "start_time": start_iso,
             "original_text": original_text,
             "translated_text": translated_text,
+            "offset_ms": offset_ms,
+            "duration_ms": duration_ms,
+            "segments": segments,
+            "translations": translations,
+            "language": language,
             "created_at": datetime.now().isoformat()
-        }).execute()
+        }, on_conflict="session_id,chunk_index").execute()
         if log:
             logging.info(f"Transcript metadata saved: {db_response}")
 
-
-        # Upload audio chunk
-        storage_response = await supabase.storage.from_(SUPABASE_BUCKET).upload(
-                file=audio_bytes,
-                path=f"{session_id}/{chunk_index}",
-            )
-        if log:
-            logging.info(f"Audio uploaded: {storage_response}")
-
     except Exception as e:
         logging.error(f"Error saving the transcript: {e}")
 
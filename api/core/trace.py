@@ -0,0 +1,178 @@
+import os
+import gzip
+import json
+import time
+import queue
+import struct
+import asyncio
+import logging
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+from api.core.resilience import UpstreamError
+
+# Optional logging setup
+logging.basicConfig(level=logging.INFO)
+
+# --------------------------
+# SESSION TRACE FILE
+# --------------------------
+# gzip stream of records:
+#   magic b"ECTR" | version u8, then per record:
+#   kind u8 | t f64 (seconds since the session start) | meta_len u32 | payload_len u32 | meta (JSON) | payload
+# Audio chunks travel as raw bytes in the payload, everything else as JSON meta.
+
+MAGIC = b"ECTR"
+VERSION = 1
+RECORD = struct.Struct("<BdII")
+
+START, CHUNK, TRANSCRIPTION, TRANSLATION, RESULT, END = range(1, 7)
+
+
+class TraceRecord(NamedTuple):
+    kind: int
+    t: float
+    meta: dict
+    payload: bytes
+
+
+def prune_traces(trace_dir: str, max_age_days: float, max_bytes: int, keep: Optional[str] = None) -> int:
+    """Delete traces older than `max_age_days`, then the oldest ones until the folder fits `max_bytes`."""
+    try:
+        entries = [e for e in os.scandir(trace_dir) if e.is_file() and e.name.endswith(".trace") and e.path != keep]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(e.stat().st_size for e in entries)
+    removed = 0
+    for entry in entries:
+        if entry.stat().st_mtime >= cutoff and total <= max_bytes:
+            break
+        size = entry.stat().st_size
+        try:
+            os.remove(entry.path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logging.info(f"📼 Pruned {removed} old session traces")
+    return removed
+
+
+class TraceRecorder:
+    """
+    Opt-in recorder of one real-time session: inbound chunks with their arrival time,
+    upstream responses and pipeline results. Records are timestamped on the event loop
+    and compressed and written by a writer thread, which also prunes old traces
+    (`max_age_days`, `max_bytes`) when it starts.
+    """
+
+    def __init__(self, path: str, meta: dict, max_age_days: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.path = path
+        self._start = time.monotonic()
+        self._queue: "queue.SimpleQueue[Optional[bytes]]" = queue.SimpleQueue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, args=(max_age_days, max_bytes),
+                                        name="trace-writer", daemon=True)
+        self._writer.start()
+        self.write(START, meta)
+
+    def _run(self, max_age_days: Optional[float], max_bytes: Optional[int]) -> None:
+        folder = os.path.dirname(self.path) or "."
+        os.makedirs(folder, exist_ok=True)
+        if max_age_days is not None and max_bytes is not None:
+            prune_traces(folder, max_age_days, max_bytes, keep=self.path)
+        try:
+            with gzip.open(self.path, "wb", compresslevel=5) as f:
+                f.write(MAGIC + bytes([VERSION]))
+                while (record := self._queue.get()) is not None:
+                    f.write(record)
+        except OSError as e:
+            logging.error(f"Session trace {self.path} could not be written: {e}")
+            return
+        logging.info(f"📼 Session trace written to {self.path}")
+
+    def write(self, kind: int, meta: Optional[dict] = None, payload: bytes = b"") -> None:
+        if self._closed:
+            return
+        encoded = json.dumps(meta or {}, ensure_ascii=False).encode("utf-8")
+        self._queue.put(RECORD.pack(kind, time.monotonic() - self._start, len(encoded), len(payload)) + encoded + payload)
+
+    def chunk(self, data: bytes, dropped: Optional[str] = None) -> None:
+        self.write(CHUNK, {"dropped": dropped} if dropped else {}, data)
+
+    def transcription(self, seq: int, response: Optional[dict], elapsed: float, error: Optional[str] = None) -> None:
+        self.write(TRANSCRIPTION, {"seq": seq, "response": response, "elapsed": round(elapsed, 4), "error": error})
+
+    def translation(self, seq: int, translations: Dict[str, str], failed: Set[str], elapsed: float) -> None:
+        self.write(TRANSLATION, {"seq": seq, "translations": translations, "failed": sorted(failed), "elapsed": round(elapsed, 4)})
+
+    def result(self, seq: int, transcription: str, translations: Dict[str, str], failed: bool, duration_ms: int) -> None:
+        self.write(RESULT, {"seq": seq, "transcription": transcription, "translations": translations,
+                            "failed": failed, "duration_ms": duration_ms})
+
+    def close(self, wait: bool = False) -> None:
+        """Finish the trace; the writer thread drains the queue (wait for it with `wait`)."""
+        if not self._closed:
+            self.write(END)
+            self._closed = True
+            self._queue.put(None)
+        if wait:
+            self._writer.join()
+
+
+def read_trace(path: str) -> Iterator[TraceRecord]:
+    with gzip.open(path, "rb") as f:
+        header = f.read(len(MAGIC) + 1)
+        if header[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a session trace")
+        while True:
+            head = f.read(RECORD.size)
+            if len(head) < RECORD.size:
+                return
+            kind, t, meta_len, payload_len = RECORD.unpack(head)
+            meta = json.loads(f.read(meta_len)) if meta_len else {}
+            yield TraceRecord(kind, t, meta, f.read(payload_len))
+
+
+# --------------------------
+# UPSTREAMS MOCKED FROM A TRACE
+# --------------------------
+
+class TraceUpstream:
+    """
+    Serves the recorded transcription and translation responses in pipeline order,
+    optionally waiting the recorded upstream latency (scaled by `speed`).
+    Same interface as api.core.utils.LiveUpstream.
+    """
+
+    def __init__(self, records: List[TraceRecord], speed: float = 1.0, delay: bool = True):
+        self.transcriptions = [r.meta for r in records if r.kind == TRANSCRIPTION]
+        self.translations = [r.meta for r in records if r.kind == TRANSLATION]
+        self.speed = speed
+        self.delay = delay
+        self._t = 0
+        self._tr = 0
+
+    async def _wait(self, elapsed: float) -> None:
+        if self.delay and self.speed > 0 and elapsed:
+            await asyncio.sleep(elapsed / self.speed)
+
+    async def transcribe(self, audio: bytes, source_lang: Optional[str], prompt: Optional[str]) -> dict:
+        if self._t >= len(self.transcriptions):
+            raise UpstreamError("trace has no more transcription responses")
+        recorded = self.transcriptions[self._t]
+        self._t += 1
+        await self._wait(recorded.get("elapsed", 0))
+        if recorded.get("error"):
+            raise UpstreamError(recorded["error"])
+        return recorded["response"]
+
+    async def translate(self, text: str, source_lang: str, target_langs: List[str], redis_client=None) -> Tuple[Dict[str, str], Set[str]]:
+        if self._tr >= len(self.translations):
+            return {t: "" for t in target_langs}, set(target_langs)
+        recorded = self.translations[self._tr]
+        self._tr += 1
+        await self._wait(recorded.get("elapsed", 0))
+        return recorded["translations"], set(recorded["failed"])
@@ -1,27 +1,105 @@
 import asyncio
+import hashlib
 import time
-from deep_translator import GoogleTranslator
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+from redis.asyncio import Redis
+from api.core.config import get_settings
+from api.core.resilience import CircuitBreaker, UpstreamError, call_with_fallback
+from api.core.profiling import span
+
+# Per-attempt deadline and total real-time budget for one chunk
+TRANSLATION_TIMEOUT = get_settings().translation_timeout
+TRANSLATION_BUDGET = get_settings().translation_budget
+TRANSLATION_CACHE_TTL = get_settings().translation_cache_ttl
+
+# deep_translator calls have no HTTP timeout: a hung call keeps its thread after the
+# deadline, so translations get their own bounded pool instead of the default executor
+_executor = ThreadPoolExecutor(max_workers=get_settings().translation_workers, thread_name_prefix="translator")
+
+google_breaker = CircuitBreaker("translator:google")
+mymemory_breaker = CircuitBreaker("translator:mymemory")
+
+
+# --------------------------
+# LANGUAGE CODES
+# --------------------------
+
+def _google_code(lang: str) -> str:
+    """'fr-FR' -> 'fr'; Chinese keeps its script variant."""
+    lang = lang.strip().lower()
+    if lang.startswith("zh"):
+        return "zh-TW" if lang in ("zh-tw", "zh-hant") else "zh-CN"
+    return lang.split("-")[0]
+
+
+@lru_cache(maxsize=None)
+def _mymemory_code(lang: str) -> str:
+    """'fr' -> 'fr-FR', 'en' -> 'en-GB'; region-qualified codes are kept as is."""
+    if "-" in lang:
+        return lang
+    from deep_translator.constants import MY_MEMORY_LANGUAGES_TO_CODES
+    prefix = lang.lower()
+    codes = list(MY_MEMORY_LANGUAGES_TO_CODES.values())
+    for code in codes:
+        if code.lower() == f"{prefix}-{prefix}":
+            return code
+    for code in codes:
+        if code.lower().split("-")[0] == prefix:
+            return code
+    return lang
+
+
+# --------------------------
+# BLOCKING CALLS (run in the translator pool)
+# --------------------------
+# deep_translator is imported on first use: it loads requests and every provider module,
+# which would otherwise weigh on each worker's cold start
+
+def _google_translate(text: str, source: str, target: str) -> str:
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source=source, target=target).translate(text).strip()
+
+
+def _mymemory_translate(text: str, source_lang: str, target_lang: str) -> str:
+    from deep_translator import MyMemoryTranslator
+    return MyMemoryTranslator(source=_mymemory_code(source_lang), target=_mymemory_code(target_lang)).translate(text).strip()
+
 
 async def translate_text(
     text: str,
     target_lang: str = "en-GB",
     source_lang: str = "fr-FR",
-    log: bool = False
+    log: bool = False,
+    budget: float = TRANSLATION_BUDGET,
+    raise_on_error: bool = False
 ) -> str:
+    """
+    Translate `text`, retrying within `budget` seconds and falling back to MyMemory
+    when Google is unavailable. On failure returns the untranslated text
+    unless `raise_on_error` is set, in which case UpstreamError is raised.
+    """
     if not text:
         return ""
 
-    if source_lang == target_lang:
+    source, target = _google_code(source_lang), _google_code(target_lang)
+    if source == target:
         return text
 
     start_time = time.time()
+    loop = asyncio.get_running_loop()
+    routes = [
+        (google_breaker, lambda: loop.run_in_executor(_executor, _google_translate, text, source, target)),
+        (mymemory_breaker, lambda: loop.run_in_executor(_executor, _mymemory_translate, text, source_lang, target_lang)),
+    ]
     try:
-        translated_text = await asyncio.to_thread(
-            lambda: GoogleTranslator(source='fr', target='en').translate(text).strip()
-        )
-    except Exception as e:
+        translated_text = await call_with_fallback(routes, budget=budget, timeout=TRANSLATION_TIMEOUT)
+    except UpstreamError as e:
         if log:
             print(f"⚠️ Translation failed: {e}")
+        if raise_on_error:
+            raise
         return text
 
     if log:
@@ -31,3 +109,94 @@ async def translate_text(
         print(f"Translation time: {elapsed}s")
 
     return translated_text or text
+
+
+# --------------------------
+# MULTI-TARGET FAN-OUT
+# --------------------------
+
+# translations currently running in this process, keyed like the Redis cache
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _cache_key(text: str, source_lang: str, target_lang: str) -> str:
+    digest = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return f"translation:{_google_code(source_lang)}:{_google_code(target_lang)}:{digest}"
+
+
+async def _translate_shared(key: str, text: str, source_lang: str, target_lang: str,
+                            redis_client: Optional[Redis], budget: float) -> str:
+    """Translate once per key: concurrent callers await the same in-flight call."""
+    if key in _inflight:
+        return await asyncio.shield(_inflight[key])
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        translated = await translate_text(text, target_lang=target_lang, source_lang=source_lang,
+                                          budget=budget, raise_on_error=True)
+        future.set_result(translated)
+    except BaseException as e:
+        # the other sessions waiting on this key must neither hang nor inherit our cancellation
+        future.set_exception(e if isinstance(e, Exception) else UpstreamError("translation cancelled"))
+        future.exception()  # mark as retrieved when nobody else is waiting
+        raise
+    finally:
+        _inflight.pop(key, None)
+
+    if redis_client is not None:
+        try:
+            await redis_client.set(key, translated, ex=TRANSLATION_CACHE_TTL)
+        except Exception as e:
+            print(f"⚠️ Translation cache write failed: {e}")
+    return translated
+
+
+async def translate_many(
+    text: str,
+    source_lang: str,
+    target_langs: List[str],
+    redis_client: Optional[Redis] = None,
+    budget: float = TRANSLATION_BUDGET
+) -> Tuple[Dict[str, str], Set[str]]:
+    """
+    Translate one transcription into several target languages concurrently.
+    Identical (text, language pair) work is shared across sessions through the Redis cache
+    and between concurrent sessions of this worker through in-flight de-duplication.
+    Targets in the source language are returned as is, without any lookup.
+    Returns ({target: text}, failed_targets); failed targets carry the untranslated text.
+    """
+    if not text:
+        return {target: "" for target in target_langs}, set()
+
+    same = {t for t in target_langs if _google_code(t) == _google_code(source_lang)}
+    pending = [t for t in target_langs if t not in same]
+    if not pending:
+        return {target: text for target in target_langs}, set()
+
+    keys = [_cache_key(text, source_lang, target) for target in pending]
+    cached = [None] * len(keys)
+    if redis_client is not None:
+        try:
+            cached = await redis_client.mget(keys)
+        except Exception as e:
+            print(f"⚠️ Translation cache read failed: {e}")
+
+    async def one(target: str, key: str, hit):
+        if hit is not None:
+            return hit.decode() if isinstance(hit, bytes) else hit
+        with span("translate_text", target=target):
+            return await _translate_shared(key, text, source_lang, target, redis_client, budget)
+
+    results = await asyncio.gather(
+        *(one(target, key, hit) for target, key, hit in zip(pending, keys, cached)),
+        return_exceptions=True
+    )
+
+    translations, failed = {target: text for target in same}, set()
+    for target, result in zip(pending, results):
+        if isinstance(result, Exception):
+            translations[target], failed = text, failed | {target}
+        else:
+            translations[target] = result
+    return {target: translations[target] for target in target_langs}, failed
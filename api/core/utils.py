@@ -1,17 +1,35 @@
 import os
+import time
 import uuid
 import asyncio
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from supabase import AsyncClient
-from pydub import AudioSegment
-from tempfile import NamedTemporaryFile
-from typing import AsyncGenerator, Tuple
+from typing import AsyncGenerator, Dict, List, NamedTuple, Optional, Set, Tuple
 from fastapi import WebSocket , HTTPException, status
 from redis.asyncio import Redis
-from api.core.groq_transcription import transcript
-from api.core.translator import translate_text
-from api.core.cache import  cache_transcript
+from api.core.groq_transcription import transcript_segments
+from api.core.translator import translate_many
+from api.core.cache import  cache_transcript, pop_failed_chunks
+from api.core.resilience import UpstreamError
+from api.core.audio import audio_processor, background_processor
+from api.core.search import search_index
 from api.core.storage import  end_session 
+from api.core.blob_store import BlobStore, MultipartUpload, LifecycleRule, apply_lifecycle
+from api.core.segments import pack_chunk_segments, merge_chunk_rows
+from api.core.overlap import prompt_tail, overlap_cut, trim_overlap_segments, segments_match_text
+from api.core.config import get_settings
+from api.core.compaction import enqueue_compaction
+from api.core.diarization_queue import enqueue_diarization
+from api.core.enrichment import enrich_session
+from api.core.waveform import waveform_etag
+from api.core.trace import TraceRecorder
+from api.core.profiling import SessionTracer, NULL_TRACER
+from api.core.language import AUTO, LanguageTracker
+
+# Audio carried over from the previous chunk, and prompt length in characters
+OVERLAP_MS = get_settings().overlap_ms
+PROMPT_CHARS = get_settings().prompt_chars
+
 
 class ConnectionManager:
     def __init__(self):
@@ -24,106 +42,255 @@ class ConnectionManager:
     def disconnect(self, client_id: int):
         self.active_connections.pop(client_id, None)
 
-    async def send_message(self, websocket: WebSocket, transcription: str, translation: str):
-        await websocket.send_json({
+    async def send_message(self, websocket: WebSocket, transcription: str, translation: str, failed: bool = False,
+                           target: str | None = None, language: str | None = None):
+        message = {
             "transcribed_text": transcription,
             "translated_text": translation
-        })
+        }
+        if target:
+            # one stream per target language on the same socket
+            message["target"] = target
+        if language:
+            # detected source language of the chunk (auto mode)
+            message["source_language"] = language
+        if failed:
+            # the chunk will be re-processed when the session is finalized
+            message["retry_pending"] = True
+        await websocket.send_json(message)
+
+
+class ChunkResult(NamedTuple):
+    chunk: bytes
+    transcription: str
+    translation: str                          # primary (first) target
+    failed: bool                              # an upstream gave up within the chunk budget
+    segments: List[Tuple[float, float, str]]  # chunk-relative (start_s, end_s, text)
+    duration_ms: int
+    translations: dict                        # {target: text} for every target
+    language: str | None = None               # source language the chunk was routed with
+
+
+class LiveUpstream:
+    """Transcription and translation calls of the real-time pipeline (replaced by a trace in replays)."""
+
+    async def transcribe(self, audio: bytes, source_lang: Optional[str], prompt: Optional[str]) -> dict:
+        return await transcript_segments(audio, source_language=source_lang, raise_on_error=True, prompt=prompt)
+
+    async def translate(self, text: str, source_lang: str, target_langs: List[str],
+                        redis_client: Redis | None = None) -> Tuple[Dict[str, str], Set[str]]:
+        return await translate_many(text, source_lang, target_langs, redis_client)
+
+
+async def _chunk_duration_ms(chunk: bytes, result: dict) -> int:
+    """Chunk duration from Whisper when available, otherwise decoded in the audio pool."""
+    if result.get("duration"):
+        return int(result["duration"] * 1000)
+    try:
+        return await audio_processor.duration_ms(chunk)
+    except Exception as e:
+        print(f"⚠️ Could not measure chunk duration: {e}")
+        return 0
 
-        
 
 async def transcribe_and_translate(
     audio_chunks: AsyncGenerator[bytes, None],
     source_lang: str = "fr",
-    target_lang: str = "en"
-) -> AsyncGenerator[Tuple[bytes, str, str], None]:
+    target_langs: List[str] | str = "en",
+    redis_client: Redis | None = None,
+    upstream: LiveUpstream | None = None,
+    recorder: TraceRecorder | None = None,
+    tracer: SessionTracer = NULL_TRACER
+) -> AsyncGenerator[ChunkResult, None]:
     """
-    Stream audio chunks, transcribe and translate each,
-    yielding (chunk, transcription, translation) in order.
+    Stream audio chunks, transcribe each once and translate it into every target concurrently,
+    yielding a ChunkResult per chunk, in order.
     Uses a bounded queue to keep producer/consumer in sync.
+    `recorder` captures the upstream responses and results of a traced session,
+    `tracer` the spans of each chunk (by position in the stream).
+    With `source_lang="auto"`, each chunk is translated from its detected language
+    (see LanguageTracker) and targets in that language are not translated.
     """
+    if isinstance(target_langs, str):
+        target_langs = [target_langs]
+    upstream = upstream or LiveUpstream()
+    languages = LanguageTracker(source_lang)
+
     queue: asyncio.Queue = asyncio.Queue(maxsize=3)  # limit memory
 
     async def producer():
-        async for chunk in audio_chunks:
-            transcription = await transcript(chunk, source_language=source_lang)
-            await queue.put((chunk, transcription))
+        try:
+            await produce()
+        except Exception:
+            # wake the consumer anyway, the error is re-raised by `await producer_task`
+            await queue.put(None)
+            raise
         await queue.put(None)  # sentinel to signal end
 
+    async def produce():
+        previous_chunk, previous_text = None, ""
+        seq = 0
+        async for chunk in audio_chunks:
+            # Send the previous chunk's audio tail along, and its text as prompt
+            audio, overlap_ms = chunk, 0
+            if previous_chunk and OVERLAP_MS > 0:
+                try:
+                    audio, overlap_ms = await audio_processor.with_overlap(previous_chunk, chunk, OVERLAP_MS)
+                except Exception as e:
+                    print(f"⚠️ Could not build chunk overlap: {e}")
+
+            started = time.monotonic()
+            try:
+                with tracer.chunk(seq).span("transcript", overlap_ms=overlap_ms):
+                    result = await upstream.transcribe(audio, languages.request_language(),
+                                                       prompt_tail(previous_text, PROMPT_CHARS) or None)
+                failed = False
+                if recorder:
+                    recorder.transcription(seq, result, time.monotonic() - started)
+            except UpstreamError as e:
+                result, failed = {"text": "", "segments": []}, True
+                if recorder:
+                    recorder.transcription(seq, None, time.monotonic() - started, str(e) or "upstream error")
+            seq += 1
+
+            if overlap_ms:
+                # the same word cut is applied to the text and to its segments
+                cut = overlap_cut(previous_text, result["text"])
+                if cut:
+                    result["text"] = " ".join(result["text"].split()[cut:])
+                result["segments"] = trim_overlap_segments(result["segments"], overlap_ms / 1000, cut)
+                if result["segments"] and not segments_match_text(result["segments"], result["text"]):
+                    print(f"⚠️ Chunk {seq - 1}: overlap-trimmed segments do not match the deduplicated text")
+                result["duration"] = max(0.0, result.get("duration", 0.0) - overlap_ms / 1000)
+
+            duration_ms = await _chunk_duration_ms(chunk, result)
+            language = languages.observe(result.get("language"), result["text"])
+            previous_chunk = chunk
+            previous_text = result["text"] or previous_text
+            await queue.put((chunk, result, failed, duration_ms, language))
+
     async def consumer():
+        seq = 0
         while True:
             item = await queue.get()
             if item is None:
                 break
-            chunk, transcription = item
-            translation = await translate_text(transcription, source_lang, target_lang)
-            yield chunk, transcription, translation
+            chunk, result, failed, duration_ms, language = item
+            transcription = result["text"]
+            started = time.monotonic()
+            with tracer.chunk(seq).span("translate", source=language, targets=",".join(target_langs)):
+                translations, failed_targets = await upstream.translate(transcription, language, target_langs, redis_client)
+            if recorder:
+                recorder.translation(seq, translations, failed_targets, time.monotonic() - started)
+                recorder.result(seq, transcription, translations, failed or bool(failed_targets), duration_ms)
+            seq += 1
+            yield ChunkResult(
+                chunk,
+                transcription,
+                translations[target_langs[0]],
+                failed or bool(failed_targets),
+                result["segments"],
+                duration_ms,
+                translations,
+                language
+            )
 
     producer_task = asyncio.create_task(producer())
 
-    # Consume and yield results
-    async for result in consumer():
-        yield result
+    try:
+        # Consume and yield results
+        async for result in consumer():
+            yield result
 
-    # Wait for producer to finish (in case queue still has items)
-    await producer_task
+        # Wait for producer to finish, re-raising what stopped it (e.g. Redis or socket errors)
+        await producer_task
+    finally:
+        # the caller stopped early: do not leave the producer blocked on a full queue
+        if not producer_task.done():
+            producer_task.cancel()
 
 
 
-async def fetch_and_merge_session_audio(supabase: AsyncClient, session_id: str):
+async def complete_session_audio(store: BlobStore, upload: MultipartUpload, session_id: str) -> int:
     """
-    Download all audio chunks from Supabase for a session,
-    merge them into a single FLAC file, delete the chunks,
-    and upload the final merged file.
+    Close the append-style upload of the session audio: the FLAC parts spooled during the
+    session are merged from disk in the background pool and streamed to `merged.flac`.
+    The same worker call computes the waveform peaks, and the manifest is updated
+    so readers never need to list the session prefix. Returns the merged size in bytes.
     """
-    bucket = supabase.storage.from_("echonote_bucket")
-    chunks = await bucket.list(path=f"{session_id}/")
+    peaks = b""
+
+    async def merge(paths, out_path):
+        nonlocal peaks
+        peaks_path = os.path.join(os.path.dirname(out_path), "waveform.bin")
+        if await background_processor.merge_files(paths, out_path, "flac", "flac", peaks_path=peaks_path):
+            with open(peaks_path, "rb") as f:
+                peaks = f.read()
+
+    parts = len(upload.parts)
+    size = await upload.complete(combine=merge, content_type="audio/flac")
+    manifest = {
+        "session_id": session_id,
+        "status": "complete" if size else "empty",
+        "audio": upload.path.split("/", 1)[1] if size else None,
+        "parts": parts,
+        "bytes": size,
+    }
 
-    if not chunks:
-        print(f"No chunks found for session {session_id}")
-        return
+    if size and peaks:
+        await store.upload(f"{session_id}/waveform.bin", peaks)
+        manifest.update({"waveform": "waveform.bin", "waveform_etag": waveform_etag(peaks)})
 
-    # Sort numerically if filenames are digits (e.g. 0.flac, 1.flac)
-    chunks = sorted(
-        chunks,
-        key=lambda c: int(c["name"].split(".")[0]) if c["name"].split(".")[0].isdigit() else c["name"]
-    )
+    await store.write_manifest(session_id, manifest)
+    if size:
+        print(f"✅ Session {session_id} audio written as a single object ({parts} parts, {size} bytes)")
+    else:
+        print(f"⚠️ No valid audio chunks merged for session {session_id}")
+    return size
 
-    merged_audio = None
-    merged_file_path = f"{session_id}_merged.flac"
 
-    for chunk_info in chunks:
-        chunk_path = f"{session_id}/{chunk_info['name']}"
-        chunk_resp = await bucket.download(chunk_path)
+async def retry_failed_chunks(
+    supabase: AsyncClient,
+    redis_client: Redis,
+    upload: MultipartUpload,
+    session_id: str,
+    source_lang: str = "fr",
+    target_langs: List[str] | None = None,
+    budget: float = 30.0
+) -> None:
+    """
+    Re-run transcription and translation for the chunks flagged as failed during the session,
+    without the real-time budget, and update their transcript rows.
+    Must run before the session audio upload is completed (parts are read from its spool or the store).
+    """
+    failed_indexes = await pop_failed_chunks(redis_client, session_id)
+    if not failed_indexes:
+        return
 
-        # Extract bytes correctly depending on client version
-        if not chunk_resp:
-            print(f"⚠️ Failed to download chunk {chunk_info['name']}")
+    target_langs = target_langs or ["en"]
+    for chunk_index in failed_indexes:
+        try:
+            audio_bytes = await upload.read_part(chunk_index)
+            result = await transcript_segments(audio_bytes, source_language=source_lang, budget=budget, raise_on_error=True)
+            language = result.get("language") or (source_lang if source_lang != AUTO else "fr")
+            translations, failed_targets = await translate_many(result["text"], language, target_langs, redis_client, budget)
+            if failed_targets:
+                raise UpstreamError(f"translation to {sorted(failed_targets)} failed")
+            row = await supabase.table("transcripts").select("offset_ms") \
+                .eq("session_id", session_id).eq("chunk_index", chunk_index).execute()
+        except Exception as e:
+            print(f"⚠️ Session {session_id}: retry of chunk {chunk_index} failed: {e}")
             continue
 
-        # Save chunk temporarily
-        with NamedTemporaryFile(delete=False, suffix=".flac") as tmp_file:
-            tmp_file.write(chunk_resp)
-            tmp_file_path = tmp_file.name
-
-        # Load audio and append
-        segment = AudioSegment.from_file(tmp_file_path, format="flac")
-        merged_audio = segment if merged_audio is None else merged_audio + segment
-
-        os.remove(tmp_file_path)
-        await bucket.remove([chunk_path])
-
-    # Export and upload merged file
-    if merged_audio:
-        merged_audio.export(merged_file_path, format="flac")
-
-        with open(merged_file_path, "rb") as f:
-            await bucket.upload(f"{session_id}/merged.flac", f)
-
-        os.remove(merged_file_path)
-        print(f"✅ Session {session_id} merged and uploaded successfully")
-    else:
-        print(f"⚠️ No valid audio chunks merged for session {session_id}")
+        offset_ms = (row.data[0].get("offset_ms") if row.data else 0) or 0
+        await supabase.table("transcripts").update({
+            "original_text": result["text"],
+            "translated_text": translations[target_langs[0]],
+            "translations": translations,
+            "language": language,
+            "segments": pack_chunk_segments(result["segments"], offset_ms, chunk_index)
+        }).eq("session_id", session_id).eq("chunk_index", chunk_index).execute()
+        print(f"✅ Session {session_id}: chunk {chunk_index} recovered on retry.")
 
 
 async def finalize_transcript(supabase: AsyncClient, session_id: str) -> Tuple[str, str, str, datetime]:
@@ -147,9 +314,15 @@ async def finalize_transcript(supabase: AsyncClient, session_id: str) -> Tuple[s
     # 2️⃣ Merge all chunks
     full_original = " ".join([chunk.get("original_text", "") for chunk in response.data]).strip()
     full_translated = " ".join([chunk.get("translated_text", "") for chunk in response.data]).strip()
+    languages = {lang for chunk in response.data for lang in (chunk.get("translations") or {})}
+    full_translations = {
+        lang: " ".join((chunk.get("translations") or {}).get(lang, "") for chunk in response.data).strip()
+        for lang in languages
+    }
     created_at = response.data[0].get("created_at", datetime.now().isoformat())
+    segments = merge_chunk_rows(response.data)
 
-    # 3️⃣ Insert final transcript (chunk_index = -1)
+    # 3️⃣ Insert final transcript (chunk_index = -1) with the time-aligned segments
     transcript_id = str(uuid.uuid4())
     final_transcript = {
         "transcript_id": transcript_id,
@@ -158,6 +331,10 @@ async def finalize_transcript(supabase: AsyncClient, session_id: str) -> Tuple[s
         "start_time": created_at,
         "original_text": full_original,
         "translated_text": full_translated,
+        "translations": full_translations,
+        "offset_ms": 0,
+        "duration_ms": max(segments["chunks"]["end_ms"], default=0),
+        "segments": segments,
         "created_at": datetime.now().isoformat()
     }
 
@@ -169,17 +346,37 @@ async def finalize_transcript(supabase: AsyncClient, session_id: str) -> Tuple[s
     return full_original, full_translated, transcript_id, created_at
 
 
-async def finalize_session(supabase:AsyncClient, redis_client:Redis , session_id: str , user_id: str)-> dict:
+async def finalize_session(
+    supabase:AsyncClient,
+    redis_client:Redis ,
+    store: BlobStore,
+    upload: MultipartUpload,
+    session_id: str ,
+    user_id: str,
+    source_lang: str = "fr",
+    target_langs: List[str] | None = None
+)-> dict:
     """
     Triggered automatically when the WebSocket is closed.
-    Ends cached session, marks it as complete, and merges audio.
+    Ends cached session, retries failed chunks, marks it as complete, and merges audio.
     """
     end_time = datetime.now()
     await end_session(supabase, session_id, end_time)
 
     try:
-        await fetch_and_merge_session_audio(supabase, session_id)
+        await retry_failed_chunks(supabase, redis_client, upload, session_id, source_lang, target_langs)
+        has_audio = bool(await complete_session_audio(store, upload, session_id))
+        if has_audio and get_settings().compaction_enabled:
+            await enqueue_compaction(redis_client, session_id)
         original, translated, transcript_id, created_at = await finalize_transcript(supabase, session_id)
+        if has_audio and get_settings().diarization_enabled:
+            await enqueue_diarization(redis_client, session_id)
+        await search_index.add(session_id, user_id, created_at, original, translated)
+        try:
+            await enrich_session(supabase, redis_client, user_id, session_id, original, created_at,
+                                 source_lang, ",".join(target_langs or []) or None)
+        except Exception as e:
+            print(f"⚠️ Session {session_id}: summary/keywords failed: {e}")
         await cache_transcript(
             redis_client,
             user_id=user_id,
@@ -198,6 +395,7 @@ async def finalize_session(supabase:AsyncClient, redis_client:Redis , session_id
             }
     except Exception as e:
         print(f"⚠️ Session {session_id}: finalization failed: {e}")
+        await upload.abort()
         return {
                 "session_id": session_id,
                 "status": "completed",
@@ -205,4 +403,36 @@ async def finalize_session(supabase:AsyncClient, redis_client:Redis , session_id
                 "created_at": end_time.isoformat(),
             }
 
-    
\ No newline at end of file
+
+async def enforce_storage_lifecycle(supabase: AsyncClient, store: BlobStore, rules: List[LifecycleRule],
+                                    batch_size: int = 200) -> int:
+    """
+    Apply the storage lifecycle rules to the sessions that newly crossed a rule's age.
+    Each session records the largest rule age already applied (sessions.lifecycle_age_days),
+    so a run only lists the sessions that expired since the previous one, and sessions
+    missed by a run are picked up by the next.
+    """
+    if not rules:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    removed = 0
+    for age in sorted({rule.max_age for rule in rules}):
+        days = age.total_seconds() / 86400
+        # objects are written shortly after the session ends, a day of grace covers them
+        cutoff = now - age - timedelta(days=1)
+        while True:
+            response = await supabase.table("sessions").select("id") \
+                .lte("ended_at", cutoff.isoformat()) \
+                .or_(f"lifecycle_age_days.is.null,lifecycle_age_days.lt.{days}") \
+                .order("ended_at").limit(batch_size).execute()
+            sessions = [s["id"] for s in response.data or []]
+            if not sessions:
+                break
+            for session_id in sessions:
+                removed += len(await apply_lifecycle(store, session_id, rules))
+            await supabase.table("sessions").update({"lifecycle_age_days": days}) \
+                .in_("id", sessions).execute()
+    if removed:
+        print(f"🧹 Storage lifecycle removed {removed} objects")
+    return removed
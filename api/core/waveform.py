@@ -0,0 +1,102 @@
+import io
+import struct
+import hashlib
+from typing import List, Optional, Tuple, Union
+from pydub import AudioSegment
+
+# --------------------------
+# MULTI-RESOLUTION PEAKS
+# --------------------------
+# Binary layout (little endian):
+#   header : b"ECWF" | version u8 | levels u8 | sample_rate u32 | duration_ms u32
+#   index  : per level -> samples_per_bin u32 | bins u32
+#   data   : per level -> bins x (min i8, max i8), interleaved
+# 8-bit peaks are plenty for drawing and keep one hour at the finest level under 500 KB.
+
+MAGIC = b"ECWF"
+VERSION = 1
+HEADER = struct.Struct("<4sBBII")
+LEVEL = struct.Struct("<II")
+SAMPLES_PER_BIN = (256, 1024, 4096, 16384)
+
+
+class PeakAccumulator:
+    """
+    Builds the peaks from 16-bit mono PCM fed part by part, so a whole session never has to be
+    decoded at once (used by the session merge). Only the finest bins are kept; the coarser
+    levels are reduced from them on `finish`.
+    """
+
+    def __init__(self, samples_per_bin: Tuple[int, ...] = SAMPLES_PER_BIN):
+        import numpy as np  # only the pool workers pay for it
+
+        self.np = np
+        self.samples_per_bin = samples_per_bin
+        self._carry = np.zeros(0, dtype=np.int16)
+        self._mins: List = []
+        self._maxs: List = []
+
+    def feed(self, pcm: bytes) -> None:
+        np = self.np
+        finest = self.samples_per_bin[0]
+        samples = np.concatenate([self._carry, np.frombuffer(pcm, dtype=np.int16)])
+        whole = len(samples) - len(samples) % finest
+        if whole:
+            frames = samples[:whole].reshape(-1, finest)
+            self._mins.append(frames.min(axis=1))
+            self._maxs.append(frames.max(axis=1))
+        self._carry = samples[whole:]
+
+    def finish(self, sample_rate: int, duration_ms: int) -> bytes:
+        np = self.np
+        finest = self.samples_per_bin[0]
+        if len(self._carry) or not self._mins:
+            self.feed(np.zeros(finest - len(self._carry), dtype=np.int16).tobytes())
+        mins, maxs = np.concatenate(self._mins), np.concatenate(self._maxs)
+
+        levels = [(finest, mins, maxs)]
+        for spb in self.samples_per_bin[1:]:
+            factor = spb // finest
+            pad = (-len(mins)) % factor
+            level_min = np.pad(mins, (0, pad), constant_values=0).reshape(-1, factor).min(axis=1)
+            level_max = np.pad(maxs, (0, pad), constant_values=0).reshape(-1, factor).max(axis=1)
+            levels.append((spb, level_min, level_max))
+
+        out = io.BytesIO()
+        out.write(HEADER.pack(MAGIC, VERSION, len(levels), sample_rate, duration_ms))
+        for spb, level_min, _ in levels:
+            out.write(LEVEL.pack(spb, len(level_min)))
+        for _, level_min, level_max in levels:
+            peaks = np.empty(len(level_min) * 2, dtype=np.int8)
+            peaks[0::2] = (level_min >> 8).astype(np.int8)
+            peaks[1::2] = (level_max >> 8).astype(np.int8)
+            out.write(peaks.tobytes())
+        return out.getvalue()
+
+
+def compute_peaks(data: Union[bytes, str], in_format: Optional[str] = "flac", samples_per_bin: Tuple[int, ...] = SAMPLES_PER_BIN) -> bytes:
+    """
+    Decode audio (bytes or a file path) and compute min/max peaks at several zoom levels
+    (runs in the audio pool). The finest level is vectorized; coarser levels are reduced from it.
+    """
+    source = io.BytesIO(data) if isinstance(data, bytes) else data
+    segment = AudioSegment.from_file(source, format=in_format).set_channels(1).set_sample_width(2)
+    peaks = PeakAccumulator(samples_per_bin)
+    peaks.feed(segment.raw_data)
+    return peaks.finish(segment.frame_rate, len(segment))
+
+
+def extract_level(blob: bytes, level: int) -> bytes:
+    """Return a waveform blob holding only one zoom level (same layout, one index entry)."""
+    magic, version, count, sample_rate, duration_ms = HEADER.unpack_from(blob, 0)
+    if magic != MAGIC or not 0 <= level < count:
+        raise ValueError(f"Invalid waveform level {level}")
+
+    index = [LEVEL.unpack_from(blob, HEADER.size + i * LEVEL.size) for i in range(count)]
+    offset = HEADER.size + count * LEVEL.size + sum(bins * 2 for _, bins in index[:level])
+    spb, bins = index[level]
+    return HEADER.pack(MAGIC, version, 1, sample_rate, duration_ms) + LEVEL.pack(spb, bins) + blob[offset:offset + bins * 2]
+
+
+def waveform_etag(blob: bytes) -> str:
+    return hashlib.sha1(blob).hexdigest()
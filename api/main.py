@@ -1,7 +1,9 @@
+import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import websocket , auth , session
-from api.routes.lifespan import lifespan
+from fastapi.staticfiles import StaticFiles
+from api.routes import websocket , auth , session , health , admin
+from api.routes.lifespan import lifespan, STORAGE_BACKEND, LOCAL_STORAGE_ROOT
 
 app = FastAPI(lifespan=lifespan)
 
@@ -17,4 +19,10 @@ app.add_middleware(
 app.include_router(auth.router)
 app.include_router(websocket.router)
 app.include_router(session.router)
+app.include_router(health.router)
+app.include_router(admin.router)
 
+# Serve the local blob store when it replaces Supabase storage
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_ROOT, exist_ok=True)
+    app.mount("/local-storage", StaticFiles(directory=LOCAL_STORAGE_ROOT), name="local-storage")
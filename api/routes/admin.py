@@ -0,0 +1,103 @@
+from typing import Optional
+from fastapi import APIRouter, Request, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from redis.asyncio import Redis
+from api.routes.auth_utils import get_current_user
+from api.core.quota import get_usage, list_usage, quota_ms, is_admin, current_period
+from api.core.profiling import PROFILING_ENABLED, loop_monitor, profile_loop
+from api.core.search import rebuild_search_index
+from api.core.config import get_settings
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+
+async def get_admin_user(user=Depends(get_current_user)):
+    """Only the users listed in ADMIN_USER_IDS may use the admin endpoints."""
+    if not is_admin(user.id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
+
+
+# -----------------------
+# USAGE / QUOTAS
+# -----------------------
+@router.get("/usage")
+async def usage(
+    request: Request,
+    period: Optional[str] = None,
+    limit: int = 100,
+    offset: int = 0,
+    admin=Depends(get_admin_user)
+):
+    """Transcription consumption of all users for a month (`YYYY-MM`, current by default)."""
+    redis_client: Redis = request.app.state.redis_client
+    return {
+        "period": period or current_period(),
+        "quota_ms": quota_ms(),
+        "users": await list_usage(redis_client, period, min(limit, 1000), offset),
+    }
+
+
+@router.get("/usage/{user_id}")
+async def user_usage(
+    user_id: str,
+    request: Request,
+    period: Optional[str] = None,
+    admin=Depends(get_admin_user)
+):
+    """Transcription consumption of one user for a month."""
+    redis_client: Redis = request.app.state.redis_client
+    used = await get_usage(redis_client, user_id, period)
+    limit = quota_ms()
+    return {
+        "user_id": user_id,
+        "period": period or current_period(),
+        "quota_ms": limit,
+        "remaining_ms": None if limit is None else max(limit - used.get("audio_ms", 0), 0),
+        **used,
+    }
+
+
+# -----------------------
+# SEARCH INDEX
+# -----------------------
+@router.post("/search/rebuild")
+async def rebuild_search(request: Request, admin=Depends(get_admin_user)):
+    """
+    Re-index every final transcript into this host's search index
+    (the index is local to the host, see api/core/search.py).
+    """
+    indexed = await rebuild_search_index(request.app.state.supabase, request.app.state.blob_store)
+    return {"indexed": indexed}
+
+
+# -----------------------
+# PROFILING
+# -----------------------
+def _require_profiling():
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled (PROFILING_ENABLED)")
+
+
+@router.get("/loop-lag")
+async def loop_lag(admin=Depends(get_admin_user)):
+    """Event loop lag measured by the background monitor."""
+    _require_profiling()
+    return loop_monitor.stats()
+
+
+@router.get("/profile")
+async def profile(
+    seconds: float = 5.0,
+    interval_ms: float = 5.0,
+    admin=Depends(get_admin_user)
+):
+    """
+    Sample the event loop thread's stack for `seconds` and return collapsed stacks
+    (`frame;frame;frame count` per line), ready for flamegraph.pl or speedscope.
+    """
+    _require_profiling()
+    seconds = min(max(seconds, 0.1), get_settings().profile_max_seconds)
+    stacks = await profile_loop(seconds, max(interval_ms, 1.0) / 1000)
+    lines = sorted(stacks.items(), key=lambda item: item[1], reverse=True)
+    return PlainTextResponse("\n".join(f"{stack} {count}" for stack, count in lines) + "\n")
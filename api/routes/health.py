@@ -0,0 +1,35 @@
+import asyncio
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+# -----------------------
+# LIVENESS
+# -----------------------
+@router.get("/live")
+async def live():
+    """The process is up and serving requests; no dependency is checked."""
+    return {"status": "alive"}
+
+
+# -----------------------
+# READINESS
+# -----------------------
+@router.get("/ready")
+async def ready(request: Request):
+    """
+    The app finished startup and Redis answers: it can accept sockets.
+    Returns 503 otherwise, so the load balancer keeps traffic away.
+    """
+    state = request.app.state
+    if not getattr(state, "ready", False):
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "starting"})
+
+    try:
+        await asyncio.wait_for(state.redis_client.ping(), timeout=1.0)
+    except Exception as e:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "degraded", "redis": str(e)})
+
+    return {"status": "ready", "startup_seconds": getattr(state, "startup_seconds", None)}
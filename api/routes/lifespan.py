@@ -1,27 +1,87 @@
-import os
-from dotenv import load_dotenv
+import time
+import asyncio
 from contextlib import asynccontextmanager
+from api.core.config import get_settings, PROCESS_START
 from api.core.storage import init_supabase
+from api.core.blob_store import init_blob_store, parse_lifecycle_rules
+from api.core.utils import enforce_storage_lifecycle
 from api.core.cache import  init_redis
+from api.core.audio import audio_processor, background_processor
+from api.core.search import search_index, rebuild_search_index
+from api.core.broadcast import broadcast_hub
+from api.core.compaction import compaction_loop
+from api.core.diarization_queue import diarization_loop
+from api.core.profiling import PROFILING_ENABLED, loop_monitor
+from api.core.retention import retention_loop
 from api.routes.websocket import manager
 
-load_dotenv()
+settings = get_settings()
+
+STORAGE_BACKEND = settings.storage_backend
+LOCAL_STORAGE_ROOT = settings.local_storage_root
+STORAGE_LIFECYCLE = parse_lifecycle_rules(settings.storage_lifecycle)
+LIFECYCLE_INTERVAL = settings.lifecycle_interval
+
+
+async def lifecycle_loop(app):
+    """Periodically enforce the configured storage lifecycle rules."""
+    while True:
+        try:
+            await enforce_storage_lifecycle(app.state.supabase, app.state.blob_store, STORAGE_LIFECYCLE)
+        except Exception as e:
+            print(f"⚠️ Storage lifecycle run failed: {e}")
+        await asyncio.sleep(LIFECYCLE_INTERVAL)
+
+
+async def backfill_search_index(app):
+    """Fill an empty search index (new host or lost file) from the stored transcripts."""
+    try:
+        if await search_index.count() == 0:
+            await rebuild_search_index(app.state.supabase, app.state.blob_store)
+    except Exception as e:
+        print(f"⚠️ Search index backfill failed: {e}")
 
-REDIS_HOST = os.getenv("REDIS_HOST")
-REDIS_PASSWORD = os.getenv("REDIS_PASSWORD")
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 @asynccontextmanager
 async def lifespan(app):
+    lifecycle_task = None
+    compaction_task = None
+    diarization_task = None
+    loop_lag_task = None
+    retention_task = None
+    search_task = None
+    app.state.ready = False
+    app.state.redis_client = None
     try:
-        # Startup code if needed
+        # Startup: independent connections are opened concurrently
         print("App starting up...")
-        app.state.supabase = await init_supabase(SUPABASE_URL , SUPABASE_KEY)
-        app.state.redis_client = await init_redis(REDIS_HOST ,REDIS_PASSWORD)
+        startup_begin = time.monotonic()
+        app.state.supabase, app.state.redis_client, _ = await asyncio.gather(
+            init_supabase(settings.supabase_url, settings.supabase_key),
+            init_redis(settings.redis_host, settings.redis_password, settings.redis_ssl),
+            asyncio.to_thread(search_index.open),
+        )
+        app.state.blob_store = init_blob_store(app.state.supabase, STORAGE_BACKEND, settings.supabase_bucket, LOCAL_STORAGE_ROOT)
+        audio_processor.start()  # workers are spawned on first job
+        lifecycle_task = asyncio.create_task(lifecycle_loop(app)) if STORAGE_LIFECYCLE else None
+        compaction_task = asyncio.create_task(compaction_loop(app)) if settings.compaction_enabled else None
+        diarization_task = asyncio.create_task(diarization_loop(app)) if settings.diarization_enabled else None
+        loop_lag_task = asyncio.create_task(loop_monitor.run()) if PROFILING_ENABLED else None
+        retention_task = asyncio.create_task(retention_loop(app)) if settings.cold_after_days else None
+        search_task = asyncio.create_task(backfill_search_index(app))
+
+        # Cold-start budget: process start (imports included) until ready
+        app.state.startup_seconds = round(time.monotonic() - PROCESS_START, 3)
+        connect_seconds = round(time.monotonic() - startup_begin, 3)
+        if app.state.startup_seconds > settings.cold_start_budget:
+            print(f"⚠️ Cold start took {app.state.startup_seconds}s (budget {settings.cold_start_budget}s, connections {connect_seconds}s)")
+        else:
+            print(f"✅ Ready in {app.state.startup_seconds}s (connections {connect_seconds}s)")
+        app.state.ready = True
         yield
     finally:
         # Shutdown logic
+        app.state.ready = False
         print("App shutting down...")
 
         # 1️⃣ Disconnect all active WebSocket clients gracefully
@@ -32,9 +92,27 @@ async def lifespan(app):
             except Exception as e:
                 print(f"Failed to disconnect client {client_id}: {e}")
         manager.active_connections.clear()
+        await broadcast_hub.close()
+
 
+        if lifecycle_task:
+            lifecycle_task.cancel()
+        if compaction_task:
+            compaction_task.cancel()
+        if diarization_task:
+            diarization_task.cancel()
+        if loop_lag_task:
+            loop_lag_task.cancel()
+        if retention_task:
+            retention_task.cancel()
+        if search_task:
+            search_task.cancel()
 
         # 3️⃣ Close external connections
-        await app.state.redis_client.close() 
+        if app.state.redis_client is not None:
+            await app.state.redis_client.close() 
+        await audio_processor.shutdown()
+        await background_processor.shutdown()
+        search_index.close()
 
         print("Shutdown complete, all resources cleaned up")
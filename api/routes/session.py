@@ -1,12 +1,18 @@
 import io
-import asyncio
-from fastapi import APIRouter, Request, Depends, HTTPException, status
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, Request, Depends, HTTPException, status, BackgroundTasks
+from fastapi.responses import StreamingResponse, Response
 from datetime import datetime
-import json
 import logging
 from api.routes.auth_utils import get_current_user
-from api.core.cache import  cache_transcript , get_cached_transcript
+from api.core.cache import  cache_transcript , get_cached_transcript, cache_segments, get_cached_segments
+from api.core.segments import slice_segments
+from api.core.blob_store import BlobStore
+from api.core.search import search_index
+from api.core.compaction import media_type_for
+from api.core.waveform import extract_level
+from api.core.retention import get_final_transcript, load_final_transcripts
+from api.core.enrichment import get_cached_previews, get_recent_session_ids, cache_preview, shorten, SUMMARY_CHARS
+from api.core.export import stream_jsonl, stream_zip, create_export_job, get_export_job, run_export_job, export_job_running
 from supabase import AsyncClient
 from redis.asyncio import Redis
 
@@ -24,10 +30,11 @@ async def get_transcript(
 ):
     """
     Return the concatenated transcript text for a given session_id.
-    First tries Redis cache.
+    Reads fall through the tiers: Redis cache, transcripts table, cold archive.
     """
     redis_client: Redis = request.app.state.redis_client
     supabase: AsyncClient = request.app.state.supabase
+    store: BlobStore = request.app.state.blob_store
 
     # Try Redis cache first
     cached_transcripts = await get_cached_transcript(redis_client, user.id, session_id)
@@ -38,17 +45,17 @@ async def get_transcript(
         created_at = cached_transcripts.get("start_time", datetime.utcnow().isoformat())
     else:
         logging.info(f"Cache miss for session {session_id}, fetching from Supabase")
-        response = await supabase.table("transcripts").select("*").eq("session_id", session_id).eq("chunk_index", -1).execute()
-        if not response.data:
+        transcript = await get_final_transcript(supabase, store, session_id)
+        if not transcript:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No transcripts found for session {session_id}")
-        original_text = response.data[0].get("original_text", "")
-        translated_text = response.data[0].get("translated_text", "")
-        created_at = response.data[0].get("created_at", datetime.utcnow().isoformat())
+        original_text = transcript.get("original_text", "")
+        translated_text = transcript.get("translated_text", "")
+        created_at = transcript.get("created_at", datetime.utcnow().isoformat())
         # cache the result in Redis for future requests
         await cache_transcript(
             redis_client,
             user.id,
-            response.data[0].get("id", ""),
+            transcript.get("transcript_id", ""),
             session_id,
             created_at,
             original_text,
@@ -74,80 +81,231 @@ async def get_last_transcripts(
     number_sessions: int = 10,
 ):
     """
-    Return the last N session summaries for the authenticated user.
+    Return the last N session previews (title, summary, keywords) for the authenticated user.
+    Full texts are not sent: use /get_transcript for a single session.
     """
     supabase: AsyncClient = request.app.state.supabase
     redis = request.app.state.redis_client
 
     # --------------------------
-    # Step 1: Get last N session IDs from Redis
+    # Step 1: Last N previews from Redis
     # --------------------------
-    recent_key = f"user:{user.id}:recent"
-    session_ids = await redis.lrange(recent_key, 0, number_sessions - 1)
-    session_ids = [sid.decode() if isinstance(sid, bytes) else sid for sid in session_ids]
-
-    # Fetch cached transcripts for those sessions
-    cached_sessions = []
-    if session_ids:
-        results = await asyncio.gather(
-            *(redis.hget(f"user:{user.id}", f"session:{sid}") for sid in session_ids)
-        )
-        cached_sessions = [
-            json.loads(r) for r in results if r
-        ]
+    session_ids = await get_recent_session_ids(redis, user.id, number_sessions)
+    previews = await get_cached_previews(redis, user.id, session_ids)
 
     # --------------------------
     # Step 2: Fallback to Supabase if not enough
     # --------------------------
-    if len(cached_sessions) < number_sessions:
-        cached_set = {s["transcript_id"] for s in cached_sessions}
-        resp = await supabase.table("sessions").select("*") \
+    if len(previews) < number_sessions:
+        resp = await supabase.table("sessions").select("id, started_at, language_source, language_target, archive") \
                     .eq("user_id", user.id) \
                     .order("started_at", desc=True) \
-                    .limit(number_sessions * 2).execute()
-        fresh_sessions = [
-            s for s in (resp.data or []) 
-            if s["id"] not in cached_set
-        ]
-        cached_sessions += fresh_sessions[:number_sessions - len(cached_sessions)]
+                    .limit(number_sessions).execute()
+        missing = [s for s in (resp.data or []) if s["id"] not in previews]
 
-    if not cached_sessions:
-        return []
+        if missing:
+            # warm tier, then the cold archive for sessions whose rows were archived
+            transcripts = await load_final_transcripts(supabase, request.app.state.blob_store, missing)
 
-    # --------------------------
-    # Step 3: Fetch final transcripts from Supabase if needed
-    # --------------------------
-    session_ids_final = [s["id"] for s in cached_sessions if "transcript_id" not in s]
-    transcripts_resp = []
-    if session_ids_final:
-        transcripts_resp = await supabase.table("transcripts").select("*") \
-                                .in_("session_id", session_ids_final) \
-                                .eq("chunk_index", -1).execute()
-        transcripts = transcripts_resp.data or []
-
-        # Update cached_sessions with fetched transcripts
-        for s in cached_sessions:
-            if "transcript_id" not in s:
-                for t in transcripts:
-                    if t["session_id"] == s["id"]:
-                        s.update(t)
-                        break
+            for s in missing:
+                t = transcripts.get(s["id"], {})
+                previews[s["id"]] = {
+                    "session_id": s["id"],
+                    "started_at": s.get("started_at"),
+                    "language_source": s.get("language_source"),
+                    "language_target": s.get("language_target"),
+                    # sessions finalized before enrichment existed only have their text
+                    "title": t.get("title") or "",
+                    "summary": t.get("summary") or shorten(t.get("original_text") or "", SUMMARY_CHARS),
+                    "keywords": t.get("keywords") or [],
+                }
+                if t:
+                    await cache_preview(redis, user.id, previews[s["id"]])
 
     # --------------------------
-    # Step 4: Format response
+    # Step 3: Format response
     # --------------------------
-    aggregated_sessions = []
-    for s in cached_sessions[:number_sessions]:
-        aggregated_sessions.append({
-            "session_id": s.get("session_id", s.get("id")),
-            "started_at": s.get("started_at"),
-            "original_text": s.get("original_text", ""),
-            "translated_text": s.get("translated_text", ""),
-            "language_source": s.get("language_source"),
-            "language_target": s.get("language_target"),
-        })
+    ordered = sorted(previews.values(), key=lambda p: str(p.get("started_at") or ""), reverse=True)
+    return ordered[:number_sessions]
+
+
+
+# -----------------------
+# TIME-RANGE TRANSCRIPT SLICE
+# -----------------------
+@router.get("/{session_id}/transcript")
+async def get_transcript_range(
+    session_id: str,
+    request: Request,
+    start: float = 0.0,
+    end: float | None = None,
+    user=Depends(get_current_user)
+):
+    """
+    Return the transcript segments overlapping [start, end) seconds of the session audio,
+    with the translations of the chunks they belong to. Used by playback to seek and highlight.
+    """
+    supabase: AsyncClient = request.app.state.supabase
+    redis_client: Redis = request.app.state.redis_client
+
+    session_resp = await supabase.table("sessions").select("user_id").eq("id", session_id).single().execute()
+    if not session_resp.data or session_resp.data["user_id"] != user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
 
-    return aggregated_sessions
+    segments = await get_cached_segments(redis_client, session_id)
+    if not segments:
+        transcript = await get_final_transcript(supabase, request.app.state.blob_store, session_id)
+        if not transcript.get("segments"):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No segments found for session {session_id}")
+        segments = transcript["segments"]
+        await cache_segments(redis_client, session_id, segments)
+
+    start_ms = int(start * 1000)
+    end_ms = int(end * 1000) if end is not None else max(segments.get("end_ms", [0]), default=0) + 1
+    return {"session_id": session_id, "start": start, "end": end, **slice_segments(segments, start_ms, end_ms)}
+
+
+
+# -----------------------
+# WAVEFORM PEAKS
+# -----------------------
+@router.get("/{session_id}/waveform")
+async def get_waveform(
+    session_id: str,
+    request: Request,
+    level: int | None = None,
+    user=Depends(get_current_user)
+):
+    """
+    Return the precomputed min/max peaks of the session audio (binary, see api/core/waveform.py),
+    all zoom levels or a single `level`. Immutable once written, so it is cached by ETag.
+    """
+    supabase: AsyncClient = request.app.state.supabase
+    store: BlobStore = request.app.state.blob_store
+
+    session_resp = await supabase.table("sessions").select("user_id").eq("id", session_id).single().execute()
+    if not session_resp.data or session_resp.data["user_id"] != user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+
+    manifest = await store.read_manifest(session_id)
+    if not manifest.get("waveform"):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Waveform not available")
+
+    etag = f'"{manifest["waveform_etag"]}-{"all" if level is None else level}"'
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    blob = await store.download(f"{session_id}/{manifest['waveform']}")
+    if not blob:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Waveform not available")
+    if level is not None:
+        try:
+            blob = extract_level(blob, level)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    return Response(content=blob, media_type="application/octet-stream", headers=headers)
+
+
+
+# -----------------------
+# SEARCH TRANSCRIPTS
+# -----------------------
+@router.get("/search")
+async def search_transcripts(
+    q: str,
+    user=Depends(get_current_user),
+    field: str = "both",
+    phrase: bool = False,
+    limit: int = 20,
+    offset: int = 0,
+):
+    """
+    Full-text search over the authenticated user's final transcripts,
+    in the original and/or translated text, with highlighted snippets.
+    """
+    if field not in ("both", "original", "translated"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="field must be one of: both, original, translated")
+
+    return await search_index.search(user.id, q, field=field, phrase=phrase, limit=min(limit, 100), offset=offset)
+
+
+
+# -----------------------
+# BULK EXPORT
+# -----------------------
+@router.get("/export")
+async def export_sessions(
+    request: Request,
+    user=Depends(get_current_user),
+    format: str = "zip",
+    include_audio: bool = False,
+    session_ids: str | None = None,
+    after: str | None = None,
+):
+    """
+    Stream many sessions at once, oldest first, as a zip archive (transcript JSON + SRT/VTT
+    subtitles, optionally audio) or as JSONL. Memory use does not grow with the export size.
+    Pass `after=<cursor>` to resume an interrupted export.
+    """
+    supabase: AsyncClient = request.app.state.supabase
+    store: BlobStore = request.app.state.blob_store
+    filters = {
+        "session_ids": [sid for sid in session_ids.split(",") if sid] if session_ids else None,
+        "after": after,
+    }
+    stamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+
+    if format == "jsonl":
+        return StreamingResponse(
+            stream_jsonl(supabase, user.id, store, **filters),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f'attachment; filename="echonote-{stamp}.jsonl"'}
+        )
+    if format == "zip":
+        return StreamingResponse(
+            stream_zip(supabase, store, user.id, include_audio, **filters),
+            media_type="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="echonote-{stamp}.zip"'}
+        )
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be one of: zip, jsonl")
+
+
+@router.post("/export/jobs")
+async def start_export_job(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    user=Depends(get_current_user),
+    include_audio: bool = False,
+):
+    """Export the whole account in the background as numbered zip parts (for very large accounts)."""
+    redis_client: Redis = request.app.state.redis_client
+    job = await create_export_job(redis_client, user.id, include_audio)
+    background_tasks.add_task(run_export_job, request.app.state.supabase, request.app.state.blob_store, redis_client, job["job_id"])
+    return job
+
+
+@router.get("/export/jobs/{job_id}")
+async def export_job_status(job_id: str, request: Request, user=Depends(get_current_user)):
+    """Return the progress of an export job and the URLs of its finished parts."""
+    store: BlobStore = request.app.state.blob_store
+    job = await get_export_job(request.app.state.redis_client, job_id)
+    if not job or job["user_id"] != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    return {**job, "part_urls": [await store.public_url(path) for path in job["parts"]]}
+
+
+@router.post("/export/jobs/{job_id}/resume")
+async def resume_export_job(job_id: str, request: Request, background_tasks: BackgroundTasks, user=Depends(get_current_user)):
+    """Resume a failed or interrupted export job from its last finished part (no-op while it runs)."""
+    redis_client: Redis = request.app.state.redis_client
+    job = await get_export_job(redis_client, job_id)
+    if not job or job["user_id"] != user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    if job["status"] != "completed" and not await export_job_running(redis_client, job_id):
+        background_tasks.add_task(run_export_job, request.app.state.supabase, request.app.state.blob_store, redis_client, job_id)
+    return job
 
 
 
@@ -161,21 +319,30 @@ async def get_audios(
     user=Depends(get_current_user)
 ):
     """
-    Return all audio files available for a given session in storage.
-    Always fetches from Supabase storage.
+    Return the audio file of a given session.
+    Reads the session manifest instead of listing the storage prefix, so the answer
+    does not depend on whether the session audio has been completed yet.
     """
-    supabase: AsyncClient = request.app.state.supabase
+    store: BlobStore = request.app.state.blob_store
 
     try:
-        files = await supabase.storage.from_("echonote_bucket").list(path=f"{session_id}/")
+        manifest = await store.read_manifest(session_id)
+        if manifest:
+            audio = manifest.get("audio")
+            urls = [await store.public_url(f"{session_id}/{audio}")] if audio else []
+            if not urls:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No audio files found for session {session_id}")
+            return {"session_id": session_id, "status": manifest.get("status"), "audio_urls": urls}
+
+        # Sessions recorded before manifests existed
+        files = await store.list(session_id)
         if not files:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"No audio files found for session {session_id}")
 
-        urls = [
-            await supabase.storage.from_("echonote_bucket").get_public_url(f"{session_id}/{f['name']}")
-            for f in files
-        ]
+        urls = [await store.public_url(f"{session_id}/{f['name']}") for f in files]
         return {"session_id": session_id, "audio_urls": urls}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching audio files: {str(e)}")
 
@@ -191,6 +358,7 @@ async def stream_audio(
     Stream a specific audio file from Supabase for an authenticated user.
     """
     supabase: AsyncClient = request.app.state.supabase
+    store: BlobStore = request.app.state.blob_store
 
     # Optional: check that this session belongs to the user
     session_resp = await supabase.table("sessions").select("user_id").eq("id", session_id).single().execute()
@@ -199,8 +367,9 @@ async def stream_audio(
 
     try:
         # Download audio file from Supabase
-        file_path = f"{session_id}/merged.flac"
-        audio_file = await supabase.storage.from_("echonote_bucket").download(file_path)
+        manifest = await store.read_manifest(session_id)
+        file_path = f"{session_id}/{manifest.get('audio') or 'merged.flac'}"
+        audio_file = await store.download(file_path)
         if not audio_file:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Audio file not found")
 
@@ -211,7 +380,7 @@ async def stream_audio(
                 yield chunk
 
         # Stream the file
-        return StreamingResponse(iter_file(), media_type="audio/flac")
+        return StreamingResponse(iter_file(), media_type=media_type_for(file_path))
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error streaming audio: {str(e)}")
\ No newline at end of file
@@ -1,12 +1,24 @@
+import os
+import re
+import json
+import time
 from typing import AsyncGenerator
 import asyncio
 import uuid
-from datetime import datetime
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect 
+from datetime import datetime, timedelta
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
 from api.core.utils import transcribe_and_translate
 from api.core.utils import ConnectionManager
 from api.core.utils import finalize_session
 from api.core.storage import ( start_session, start_transcript)
+from api.core.cache import flag_failed_chunk, seen_chunk, remember_chunk
+from api.core.segments import pack_chunk_segments
+from api.core.broadcast import broadcast_hub, start_broadcast, publish_event, end_broadcast, get_broadcast
+from api.core.quota import acquire_socket, release_socket, hit_rate_limit, UsageLedger, quota_ms
+from api.core.config import get_settings
+from api.core.trace import TraceRecorder
+from api.core.profiling import session_tracer, traced_task
+from api.core.language import AUTO
 from api.routes.auth_utils import authenticate_websocket
 
 router = APIRouter()
@@ -14,6 +26,20 @@ router = APIRouter()
 
 manager = ConnectionManager()
 
+settings = get_settings()
+
+# client-generated id of a recording, kept across reconnects (`?resume=<id>`)
+RESUME_ID = re.compile(r"^[A-Za-z0-9_-]{8,64}$")
+
+
+def _announced_chunk_id(text: str) -> str | None:
+    """Chunk id announced by a `{"chunk_id": ...}` text frame sent before the audio frame."""
+    try:
+        chunk_id = json.loads(text).get("chunk_id")
+    except (ValueError, AttributeError):
+        return None
+    return str(chunk_id)[:64] if chunk_id is not None else None
+
 
 @router.websocket("/ws/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: int):
@@ -24,56 +50,270 @@ async def websocket_endpoint(websocket: WebSocket, client_id: int):
 
     user_id = user.id
 
-    # get the language from the query parameters
+    # get the language from the query parameters ("auto" detects it per chunk)
     query = websocket.query_params
     source_language = query.get("source", "fr")
-    target_language = query.get("target", "en")
+    # several targets may be requested as a comma-separated list, the first one is primary
+    target_languages = [t.strip() for t in query.get("target", "en").split(",") if t.strip()] or ["en"]
+    # broadcast mode: results are also published for read-only listeners
+    broadcast = query.get("broadcast", "false").lower() in ("1", "true", "yes")
+    # session trace (chunks, upstream responses) for offline replay
+    trace = settings.trace_mode == "all" or (
+        settings.trace_mode == "opt-in" and query.get("trace", "false").lower() in ("1", "true", "yes"))
+    # resumable recording: chunks resent after a reconnect are recognized across sessions
+    resume = query.get("resume")
+    resume = resume if resume and RESUME_ID.match(resume) else None
+
+    redis_client = websocket.app.state.redis_client
+
+    # ---- Admission: concurrent sockets and monthly quota ----
+    lease = await acquire_socket(redis_client, user_id, settings.max_sockets_per_user)
+    if lease is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Too many concurrent sessions")
+        return
+    # from here on the lease is released whatever happens
+    try:
+        ledger = UsageLedger(redis_client, user_id, quota_ms(), settings.usage_flush_interval, lease)
+        await ledger.load()
+        if ledger.exhausted:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Transcription quota exceeded")
+            return
+        # keeps the lease alive while the socket is idle
+        keepalive = asyncio.create_task(ledger.keepalive())
+        try:
+            await _run_session(websocket, client_id, user_id, ledger, lease, source_language, target_languages,
+                               broadcast, trace, resume)
+        finally:
+            keepalive.cancel()
+    finally:
+        await release_socket(redis_client, user_id, lease)
+
+
+async def _run_session(websocket: WebSocket, client_id: int, user_id: str, ledger: UsageLedger, lease: str,
+                       source_language: str, target_languages: list, broadcast: bool, trace: bool,
+                       resume: str | None = None):
+    """One admitted recording session, from the first chunk to finalization."""
+    supabase = websocket.app.state.supabase
+    redis_client = websocket.app.state.redis_client
+    store = websocket.app.state.blob_store
 
     await manager.connect(websocket, client_id)
 
     # ---- Initialize session ----
     session_id = str(uuid.uuid4())
     start_time = datetime.now()
+    # Session audio is written as a single object; chunks are appended as they arrive
+    # and each one is persisted to the store right away
+    audio_upload = store.create_multipart(f"{session_id}/merged.flac", durable=True)
+    # chunk ids are deduplicated per resumable recording, or per session without one
+    dedup_scope = f"recording:{user_id}:{resume}" if resume else f"session:{session_id}"
+    recorder = None
+    try:
+        await ledger.record(sessions=1)
+        recorder = TraceRecorder(os.path.join(settings.trace_dir, f"{session_id}.trace"), {
+            "session_id": session_id,
+            "source": source_language,
+            "targets": target_languages,
+            "started_at": start_time.isoformat(),
+        }, settings.trace_max_age_days, settings.trace_max_mb * 1024 * 1024) if trace else None
+        tracer = session_tracer(session_id)
 
-    supabase = websocket.app.state.supabase
-    redis_client = websocket.app.state.redis_client 
+        await start_session(supabase , session_id, user_id, start_time, source_language, ",".join(target_languages))
+        await store.write_manifest(session_id, {
+            "session_id": session_id,
+            "status": "recording",
+            "audio": None,
+            "audio_parts": audio_upload.parts_prefix.split("/", 1)[1],
+        })
 
+        if broadcast:
+            await start_broadcast(redis_client, session_id, user_id, source_language, target_languages)
+            # the speaker shares this id with the listeners
+            await websocket.send_json({"session_id": session_id, "broadcast": True})
 
-    await start_session(supabase , session_id, user_id, start_time, source_language, target_language)
+        chunk_index = 0 
+        offset_ms = 0  # position of the next chunk in the session audio
 
-    chunk_index = 0 
+        # Create async generator that yields chunks from the websocket
+        async def audio_stream() -> AsyncGenerator[bytes, None]:
+            accepted = 0
+            announced = None
+            try:
+                while True:
+                    waiting = time.monotonic()
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        return
+                    if message.get("text") is not None:
+                        announced = _announced_chunk_id(message["text"])
+                        continue
+                    chunk = message.get("bytes")
+                    if not chunk:
+                        continue
+                    received = time.monotonic()
+                    # only client-announced ids are deduplicated: identical bytes (e.g. two
+                    # chunks of silence) are legitimate repeats, not retries
+                    chunk_id, announced = announced, None
+                    # resent chunks (client retries) are acknowledged, not processed again
+                    if chunk_id and await seen_chunk(redis_client, dedup_scope, chunk_id):
+                        if recorder:
+                            recorder.chunk(chunk, dropped="duplicate")
+                        await websocket.send_json({"duplicate": True, "chunk_id": chunk_id})
+                        continue
+                    if ledger.exhausted:
+                        await websocket.send_json({"error": "quota_exceeded", "used_ms": ledger.used_ms})
+                        return
+                    allowed, retry_after = await hit_rate_limit(redis_client, user_id, settings.chunk_rate_limit)
+                    if not allowed:
+                        if recorder:
+                            recorder.chunk(chunk, dropped="rate_limited")
+                        # the chunk is dropped, the client should slow down
+                        await websocket.send_json({"error": "rate_limited", "retry_after": retry_after,
+                                                   "chunk_id": chunk_id})
+                        continue
+                    # only accepted chunks count as received: a refused one may be sent again
+                    if chunk_id and not await remember_chunk(redis_client, dedup_scope, chunk_id):
+                        await websocket.send_json({"duplicate": True, "chunk_id": chunk_id})
+                        continue
+                    if recorder:
+                        recorder.chunk(chunk)
+                    tracer.chunk(accepted).record("receive_bytes", waiting, received, bytes=len(chunk))
+                    accepted += 1
+                    yield chunk
+            except WebSocketDisconnect:
+                return
 
-    # Create async generator that yields chunks from the websocket
-    async def audio_stream() -> AsyncGenerator[bytes, None]:
-        try:
-            while True:
-                chunk = await websocket.receive_bytes()
-                yield chunk
-        except WebSocketDisconnect:
-            return
+        async for result in transcribe_and_translate(audio_stream(), source_language, target_languages, redis_client,
+                                                     recorder=recorder, tracer=tracer):
 
-    try:
-        async for chunk , transcription, translation in transcribe_and_translate(audio_stream(), source_language, target_language):
+            if result.failed:
+                await flag_failed_chunk(redis_client, session_id, chunk_index)
+
+            await audio_upload.append(result.chunk)
+
+            chunk_trace = tracer.chunk(chunk_index)
 
-            # Persist asynchronously
-            asyncio.create_task(start_transcript(
+            # Persist asynchronously, stamped on the session audio timeline
+            traced_task(chunk_trace, "start_transcript", start_transcript(
                 supabase,
-                audio_bytes=chunk,  # adapt if you want to store files
                 transcript_id=str(uuid.uuid4()),
                 session_id=session_id,
                 chunk_index=chunk_index,
-                start_time=datetime.now(),
-                original_text=transcription,
-                translated_text=translation
+                start_time=start_time + timedelta(milliseconds=offset_ms),
+                original_text=result.transcription,
+                translated_text=result.translation,
+                translations=result.translations,
+                language=result.language,
+                offset_ms=offset_ms,
+                duration_ms=result.duration_ms,
+                segments=pack_chunk_segments(result.segments, offset_ms, chunk_index)
             ))
 
-            # Send to client
-            await manager.send_message(websocket, transcription, translation)
+            # Send to client, one message per target language
+            # the detected language is only news to the client in auto mode
+            detected = result.language if source_language == AUTO else None
+            with chunk_trace.span("send_message"):
+                if len(target_languages) == 1:
+                    await manager.send_message(websocket, result.transcription, result.translation, result.failed,
+                                               language=detected)
+                else:
+                    for target, translation in result.translations.items():
+                        await manager.send_message(websocket, result.transcription, translation, result.failed, target,
+                                                   language=detected)
+
+            if broadcast:
+                try:
+                    await publish_event(redis_client, session_id, {
+                        "type": "chunk",
+                        "chunk_index": chunk_index,
+                        "offset_ms": offset_ms,
+                        "transcribed_text": result.transcription,
+                        "translated_text": result.translation,
+                        "translations": result.translations,
+                        "source_language": result.language,
+                    })
+                except Exception as e:
+                    # listeners miss this chunk, the speaker's session goes on
+                    print(f"⚠️ Session {session_id}: broadcast of chunk {chunk_index} failed: {e}")
+            chunk_trace.seal()
+            await ledger.record(audio_ms=result.duration_ms, chunks=1)
             chunk_index += 1
+            offset_ms += result.duration_ms
 
     finally:
         print(f"[Session End] Client {client_id} closed WebSocket — finalizing session {session_id}...")
-        await finalize_session(supabase, redis_client, session_id, user_id)
+        if recorder:
+            recorder.close()
+        if broadcast:
+            try:
+                await end_broadcast(redis_client, session_id)
+            except Exception as e:
+                print(f"⚠️ Session {session_id}: could not end broadcast: {e}")
+        try:
+            await ledger.flush()
+            # free the slot now, finalization can take a while
+            ledger.lease = None
+            await release_socket(redis_client, user_id, lease)
+        except Exception as e:
+            print(f"⚠️ Session {session_id}: could not close usage: {e}")
+        await finalize_session(supabase, redis_client, store, audio_upload, session_id, user_id, source_language, target_languages)
         manager.disconnect(client_id)
         print(f"[Session End] Session {session_id} finalized successfully.")
 
+
+@router.websocket("/ws/listen/{session_id}")
+async def listener_endpoint(websocket: WebSocket, session_id: str):
+    """
+    Read-only listener of a broadcast session.
+    Late joiners first receive the backlog, then live events. `?target=xx` keeps one translation.
+    """
+    user = await authenticate_websocket(websocket)
+    if not user:
+        return  # closed already
+
+    redis_client = websocket.app.state.redis_client
+    meta = await get_broadcast(redis_client, session_id)
+    if not meta:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Unknown broadcast session")
+        return
+
+    target = websocket.query_params.get("target")
+    await websocket.accept()
+    await websocket.send_json({"type": "joined", "session_id": session_id, **meta})
+
+    queue, backlog = await broadcast_hub.subscribe(redis_client, session_id)
+
+    async def forward():
+        for _, event in backlog:
+            yield event
+        while True:
+            _, event = await queue.get()
+            yield event
+
+    async def send_events():
+        async for event in forward():
+            if target and event.get("type") == "chunk":
+                event = {**event, "translated_text": event.get("translations", {}).get(target, event.get("translated_text"))}
+                event.pop("translations", None)
+            await websocket.send_json(event)
+            if event.get("type") == "end":
+                return
+
+    async def wait_disconnect():
+        # listeners are read-only: anything they send is ignored
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    sender = asyncio.create_task(send_events())
+    watcher = asyncio.create_task(wait_disconnect())
+    try:
+        await asyncio.wait({sender, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        watcher.cancel()
+        broadcast_hub.unsubscribe(session_id, queue)
+        if not watcher.done():
+            try:
+                await websocket.close()
+            except Exception:
+                pass
@@ -0,0 +1,6 @@
+-- Largest storage lifecycle rule age (days) already applied to the session's objects.
+alter table public.sessions
+    add column if not exists lifecycle_age_days double precision;
+
+create index if not exists sessions_lifecycle_idx
+    on public.sessions (ended_at, lifecycle_age_days);
@@ -0,0 +1,5 @@
+-- Chunk position on the session audio timeline and packed segment timestamps.
+alter table public.transcripts
+    add column if not exists offset_ms integer not null default 0,
+    add column if not exists duration_ms integer not null default 0,
+    add column if not exists segments jsonb;
@@ -0,0 +1,3 @@
+-- Translations of the chunk into every target language of the session: {target: text}.
+alter table public.transcripts
+    add column if not exists translations jsonb;
@@ -0,0 +1,4 @@
+-- Session audio size before and after archival compaction.
+alter table public.sessions
+    add column if not exists audio_bytes_original bigint,
+    add column if not exists audio_bytes_archived bigint;
@@ -0,0 +1,10 @@
+-- One row per (session, chunk): start_transcript upserts on these columns,
+-- so a retried write replaces the row instead of adding a second one.
+delete from public.transcripts t
+using public.transcripts d
+where t.session_id = d.session_id
+  and t.chunk_index = d.chunk_index
+  and t.ctid < d.ctid;
+
+alter table public.transcripts
+    add constraint transcripts_session_chunk_key unique (session_id, chunk_index);
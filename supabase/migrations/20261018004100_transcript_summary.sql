@@ -0,0 +1,5 @@
+-- Post-session enrichment stored on the final transcript row (chunk_index = -1).
+alter table public.transcripts
+    add column if not exists title text,
+    add column if not exists summary text,
+    add column if not exists keywords text[];
@@ -0,0 +1,6 @@
+-- Location of the session's final transcript in the cold tier: {path, offset, length}.
+alter table public.sessions
+    add column if not exists archive jsonb;
+
+create index if not exists sessions_unarchived_idx
+    on public.sessions (ended_at) where archive is null;
@@ -0,0 +1,3 @@
+-- Source language each chunk was transcribed and translated from (detected in auto mode).
+alter table public.transcripts
+    add column if not exists language text;
@@ -38,6 +38,24 @@ class SessionProvider extends ChangeNotifier {
     }
   }
 
+  /// Fetch the full transcript of one session (the list only carries previews)
+  Future<Map<String, dynamic>?> fetchTranscript(String sessionId) async {
+    try {
+      final url = '${ApiService.baseUrl}/session/get_transcript?session_id=$sessionId';
+      final token = await ApiService.getToken();
+      if (token == null) throw Exception('Not authenticated');
+
+      final res = await ApiService.httpGet(url, token: token);
+      if (res != null && res is Map) {
+        return Map<String, dynamic>.from(res);
+      }
+    } catch (e) {
+      _errorMessage = e.toString();
+      notifyListeners();
+    }
+    return null;
+  }
+
   /// Fetch audio URLs (if you want just URLs)
   Future<List<String>> fetchAudioUrls(String sessionId) async {
     try {
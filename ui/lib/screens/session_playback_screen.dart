@@ -33,28 +33,20 @@ class _SessionPlaybackScreenState extends State<SessionPlaybackScreen> {
   Future<void> _loadSession() async {
     final provider = Provider.of<SessionProvider>(context, listen: false);
 
-
-    // Find session in provider cache
+    // Preview (title, languages, date) from the provider cache, if listed
+    Map<String, dynamic> preview = {};
     try {
-      sessionData = provider.sessions.firstWhere(
-        (s) => s['id'] == widget.sessionId,
+      preview = provider.sessions.firstWhere(
+        (s) => s['session_id'] == widget.sessionId,
       );
     } catch (e) {
-      sessionData = null;
-    }
-    
-    // If not found, fetch sessions and try again
-    if (sessionData == null) {
-      await provider.fetchLastSessions();
-      try {
-        sessionData = provider.sessions.firstWhere(
-          (s) => s['id'] == widget.sessionId,
-        );
-      } catch (e) {
-        sessionData = null;
-      }
+      preview = {};
     }
 
+    // Full texts come from the transcript endpoint
+    final transcript = await provider.fetchTranscript(widget.sessionId);
+    sessionData = transcript != null ? {...preview, ...transcript} : null;
+
 
     // Load audio bytes
     if (sessionData != null) {
@@ -178,12 +170,12 @@ class _SessionPlaybackScreenState extends State<SessionPlaybackScreen> {
       crossAxisAlignment: CrossAxisAlignment.start,
       children: [
         Text(
-          sessionData?['name'] ?? 'Unknown Session',
+          ((sessionData?['title'] ?? '') as String).isNotEmpty ? sessionData!['title'] : 'Unknown Session',
           style: const TextStyle(fontSize: 20, fontWeight: FontWeight.bold),
         ),
         const SizedBox(height: 4),
         Text(
-          'Source: ${sessionData?['source_language'] ?? '?'} → Target: ${sessionData?['target_language'] ?? '?'}',
+          'Source: ${sessionData?['language_source'] ?? '?'} → Target: ${sessionData?['language_target'] ?? '?'}',
         ),
         const SizedBox(height: 4),
         Text(
@@ -191,7 +183,7 @@ class _SessionPlaybackScreenState extends State<SessionPlaybackScreen> {
         ),
         const SizedBox(height: 4),
         Text(
-          'Date: ${sessionData?['created_at'] ?? '?'}',
+          'Date: ${sessionData?['started_at'] ?? sessionData?['created_at'] ?? '?'}',
         ),
       ],
     );
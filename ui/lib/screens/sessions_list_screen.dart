@@ -49,13 +49,13 @@ class _SessionsListScreenState extends State<SessionsListScreen> {
                   margin: const EdgeInsets.symmetric(horizontal: 12, vertical: 6),
                   child: ListTile(
                     leading: const Icon(Icons.mic),
-                    title: Text(session['name'] ?? 'Unnamed Session'),
-                    subtitle: Text(session['original_text'] ?? ''),
+                    title: Text((session['title'] ?? '').isNotEmpty ? session['title'] : 'Unnamed Session'),
+                    subtitle: Text(session['summary'] ?? ''),
                     onTap: () {
                       Navigator.pushNamed(
                         context,
                         '/session-playback',
-                        arguments: session['id'],
+                        arguments: session['session_id'],
                       );
                     },
                   ),
@@ -10,9 +10,18 @@ class WebSocketService {
   WebSocketChannel? _channel;
   StreamController<Map<String, dynamic>>? _messageController;
   String? _clientId;
-  final List<Uint8List> _audioQueue = [];
+  final List<MapEntry<int, Uint8List>> _audioQueue = [];
   bool _isConnecting = false;
 
+  /// Resumable recording: the id and chunk numbers survive reconnects, so the
+  /// server recognizes chunks sent again after a dropped connection.
+  String? _recordingId;
+  int _chunkSeq = 0;
+  final List<MapEntry<int, Uint8List>> _recentChunks = [];
+  static const int _resendChunks = 3;
+  String _sourceLanguage = 'fr';
+  String _targetLanguage = 'en';
+
   /// Optional debug flag
   final bool debug;
 
@@ -35,6 +44,9 @@ class WebSocketService {
   }) async {
     if (_isConnecting || _channel != null) return;
     _isConnecting = true;
+    _sourceLanguage = sourceLanguage;
+    _targetLanguage = targetLanguage;
+    _recordingId ??= 'rec-${DateTime.now().microsecondsSinceEpoch}';
 
     try {
       final token = await ApiService.getToken();
@@ -42,7 +54,7 @@ class WebSocketService {
 
       _clientId = DateTime.now().millisecondsSinceEpoch.toString();
       final wsUrl =
-          '${EnvConfig.wsBaseUrl}/ws/$_clientId?source=$sourceLanguage&target=$targetLanguage';
+          '${EnvConfig.wsBaseUrl}/ws/$_clientId?source=$sourceLanguage&target=$targetLanguage&resume=$_recordingId';
 
       if (debug) print('[WS] Connecting to $wsUrl');
 
@@ -69,18 +81,20 @@ class WebSocketService {
           if (debug) print('[WS] Connection error: $error');
           _messageController!.addError(error);
         },
-        onDone: () async {
+        onDone: () {
           if (debug) print('[WS] Connection closed');
-          await disconnect();
+          // keep the recording: the next chunk reconnects and resends
+          _channel = null;
         },
       );
 
-      // Send any queued audio
-      if (_audioQueue.isNotEmpty) {
-        for (var chunk in _audioQueue) {
-          _channel!.sink.add(chunk);
-        }
-        _audioQueue.clear();
+      // Resend the last chunks (they may have been lost with the previous
+      // connection, the server drops the ones it already has) and the queue
+      final pending = [..._recentChunks, ..._audioQueue];
+      _recentChunks.clear();
+      _audioQueue.clear();
+      for (var entry in pending) {
+        _send(entry.key, entry.value);
       }
 
       if (debug) print('[WS] Connected successfully');
@@ -94,27 +108,49 @@ class WebSocketService {
 
   /// Send audio bytes (FLAC)
   void sendAudio(Uint8List audioData) {
+    final seq = _chunkSeq++;
     if (_channel != null && isConnected) {
       try {
-        _channel!.sink.add(audioData);
+        _send(seq, audioData);
       } catch (e) {
         if (debug) print('[WS] Error sending audio: $e');
       }
     } else {
       if (debug) print('[WS] WebSocket not connected, queueing audio');
-      _audioQueue.add(audioData);
+      _audioQueue.add(MapEntry(seq, audioData));
+      _reconnect();
     }
   }
 
+  /// Announce the chunk id, then send the audio frame
+  void _send(int seq, Uint8List audioData) {
+    _channel!.sink.add(jsonEncode({'chunk_id': seq}));
+    _channel!.sink.add(audioData);
+    _recentChunks.add(MapEntry(seq, audioData));
+    if (_recentChunks.length > _resendChunks) _recentChunks.removeAt(0);
+  }
+
+  void _reconnect() {
+    if (_recordingId == null || _isConnecting) return;
+    connect(sourceLanguage: _sourceLanguage, targetLanguage: _targetLanguage)
+        .catchError((e) {
+      if (debug) print('[WS] Reconnect failed: $e');
+    });
+  }
+
   /// Disconnect safely
   Future<void> disconnect() async {
     try {
+      // end the recording first so a late chunk does not reconnect
+      _recordingId = null;
+      _chunkSeq = 0;
+      _audioQueue.clear();
+      _recentChunks.clear();
       await _channel?.sink.close();
       await _messageController?.close();
       _channel = null;
       _messageController = null;
       _clientId = null;
-      _audioQueue.clear();
       if (debug) print('[WS] Disconnected');
     } catch (e) {
       if (debug) print('[WS] Error during disconnect: $e');